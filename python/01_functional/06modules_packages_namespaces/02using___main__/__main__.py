@@ -12,7 +12,7 @@ globals()    # {..., 'timing': <module 'timing' from '...timing.py'>}
 code = '[x**3 for x in range(10_000)]'
 
 print(timing.timeit(code, 10))
-# Timing(repeats=10, elapsed=0.0371894, average=0.003718939999)
+# Timing(repeats=10, elapsed=0.4511, average=0.000902319626, number=50, min=0.000709092, ...)
 
 #_________________________________________________________________________________________________
 # another use case of the __main__ is that, we can execute Python modules by executing its 
@@ -21,6 +21,6 @@ print(timing.timeit(code, 10))
 # ~$ python .\02using___main__\
 
 # Running timing.py file...
-# Timing(repeats=10, elapsed=0.0371, average=0.003718939999)
+# Timing(repeats=10, elapsed=0.4511, average=0.000902319626, number=50, min=0.000709092, ...)
 
 # when we do that, Python will automatically look up for the __main__.py file and executes that.
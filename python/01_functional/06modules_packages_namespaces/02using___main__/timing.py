@@ -4,38 +4,595 @@
 print('Running timing.py file...')
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import repeat
 from time import perf_counter
 import argparse
+import gc
+import json
+import math
+import os
+import platform
+import queue
+import statistics
+import subprocess
+import sys
+import textwrap
+import tracemalloc
 
-Timing = namedtuple('Timing', 'repeats elapsed average')
+# every field added after `average` has a default, so Timing(repeats, elapsed, average)
+# keeps working like before.
+Timing = namedtuple(
+    'Timing',
+    'repeats elapsed average number min median stdev percentiles ci overhead samples memory',
+    defaults=(1, None, None, 0.0, None, None, 0.0, (), None),
+)
+# repeats     -> how many samples were measured
+# number      -> how many times the code runs inside each sample (the loop count)
+# elapsed     -> total time of all the samples, the loop overhead already subtracted
+# average     -> mean time of one execution of the code
+# min, median, stdev, percentiles {5, 25, 75, 95}, ci (95% interval of the mean): per execution
+# overhead    -> time of one empty loop iteration, subtracted from every sample
+# samples     -> time of one execution, for each sample (the overhead taken out, so a snippet
+#                cheaper than the clock can tell gets samples around 0, some of them negative)
+# memory      -> a Memory, when timeit() was asked to measure the allocations too
 
-def timeit(code, repeats=1):
-    # compile the given code just once:
-    code = compile(code, filename='<string>', mode='exec')
-    start = perf_counter()
-    for _ in range(repeats):
-        # executing the compiled code `n` times:
-        exec(code)
-    elapsed = perf_counter() - start
-    average = elapsed / repeats
-    return Timing(repeats, elapsed, average)
-    #      Timing(repeats=50, elapsed=0.13, average=0.00263233600)
+Memory = namedtuple('Memory', 'peak net blocks number top')
+# peak   -> bytes allocated at the highest point of one execution (what it needs to run)
+# net    -> bytes still allocated after each execution (what it leaves behind, a leak or a cache)
+# blocks -> memory blocks still allocated after each execution
+# number -> executions measured for net and blocks
+# top    -> [(line, bytes, blocks), ...] the lines that left the most memory behind
+
+# the code runs inside a compiled function, in a plain `for` loop, like the stdlib timeit:
+# an exec() per iteration would cost more than many of the snippets we want to time.
+TEMPLATE = '''
+def inner(_loops, _timer):
+{setup}
+    _start = _timer()
+    for _ in _loops:
+{code}
+    return _timer() - _start
+'''
+
+def make_timer(code, setup='pass'):
+    source = TEMPLATE.format(
+        setup=textwrap.indent(textwrap.dedent(setup) or 'pass', ' ' * 4),
+        code=textwrap.indent(textwrap.dedent(code) or 'pass', ' ' * 8),
+    )
+    namespace = {}
+    exec(compile(source, filename='<string>', mode='exec'), namespace)
+    inner = namespace['inner']
+    return lambda number, timer=perf_counter: inner(repeat(None, number), timer)
+
+def calibrate(run, min_time=0.02):
+    # the loop count: 1, 2, 5, 10, 20, 50... until one sample takes at least min_time,
+    # so that the clock resolution and the timer calls dont matter anymore.
+    number = 1
+    while True:
+        for step in (1, 2, 5):
+            if run(number * step) >= min_time:
+                return number * step
+        number *= 10
+
+# t distribution, 97.5% quantile for the 95% confidence intervals (1.96 from 30 samples on)
+T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045)
+
+def t_critical(degrees):
+    return T_975[degrees - 1] if degrees <= len(T_975) else 1.96
+
+def summarize(samples, number, overhead):
+    # samples: the time of one execution, for each sample
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if n > 1 else 0.0
+    if n > 1:
+        cuts = statistics.quantiles(samples, n=20, method='inclusive')
+        percentiles = {5: cuts[0], 25: cuts[4], 75: cuts[14], 95: cuts[18]}
+        margin = t_critical(n - 1) * stdev / math.sqrt(n)
+    else:
+        percentiles = dict.fromkeys((5, 25, 75, 95), samples[0])
+        margin = 0.0
+    return Timing(
+        repeats=n, elapsed=sum(samples) * number, average=mean, number=number,
+        min=min(samples), median=statistics.median(samples), stdev=stdev,
+        percentiles=percentiles, ci=(mean - margin, mean + margin),
+        overhead=overhead, samples=tuple(samples),
+    )
+
+def timeit(code, repeats=1, setup='', number=None, warmup=1, disable_gc=True, min_time=0.02,
+           memory=False):
+    # repeats:  how many samples to measure, each one runs the code `number` times
+    # number:   None to calibrate it automatically, so one sample takes at least min_time
+    # warmup:   samples run before measuring, and thrown away (caches, lazy imports...)
+    # memory:   also measure the allocations (see measure_memory), after the timed samples
+    run = make_timer(code, setup)
+    empty = make_timer('pass', setup)
+    gc_was_enabled = gc.isenabled()
+    if disable_gc: # a collection in the middle of a sample would land on whatever runs then
+        gc.disable()
+    try:
+        number = number or calibrate(run, min_time)
+        for _ in range(warmup):
+            run(number)
+        # the cost of the loop itself, the median of a few runs of an empty body: the best of
+        # them would be below the typical sample, and a snippet as cheap as the empty loop
+        # would look slower than it
+        overhead = statistics.median(empty(number) for _ in range(5)) / number
+        # not clamped at 0: that would only move the mean and the ci of a tiny snippet up
+        samples = [run(number) / number - overhead for _ in range(repeats)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    timing = summarize(samples, number, overhead)
+    if memory:
+        timing = timing._replace(memory=measure_memory(code, setup))
+    return timing
+    #      Timing(repeats=50, elapsed=0.13, average=0.00263233600, number=1, min=..., ...)
+
+#__________________________________________________________________________________________________
+# memory: tracemalloc records every block python allocates, with the line that asked for it.
+# it makes the code several times slower, so it never runs during the timed samples.
+# the compiled loop calls _timer() right before and right after the loop: instead of the
+# clock we pass a MemoryProbe, which reads tracemalloc at those two points. so the memory
+# of the setup code is not counted, only what the loop does.
+# tracemalloc only sees the blocks that are alive, not each malloc call: a snippet that
+# allocates and frees a list every time shows it in peak, but not in net nor blocks.
+
+class MemoryProbe:
+    def __init__(self, snapshots=False):
+        self.snapshots = snapshots
+        self.calls = 0
+
+    def __call__(self):
+        if self.calls == 0: # before the loop
+            gc.collect()
+            self.before = tracemalloc.take_snapshot() if self.snapshots else None
+            tracemalloc.reset_peak()
+            self.start = tracemalloc.get_traced_memory()[0]
+        else:               # after the loop
+            gc.collect() # garbage in reference cycles is not a leak, it just wasnt collected yet
+            self.end, self.peak = tracemalloc.get_traced_memory()
+            self.after = tracemalloc.take_snapshot() if self.snapshots else None
+        self.calls += 1
+        return 0.0
+
+IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__), # the probe itself
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+)
+
+def measure_memory(code, setup='', number=100, top=5):
+    run = make_timer(code, setup)
+    # the snippet is compiled inside TEMPLATE, so its line 1 is not line 1 of '<string>'
+    first_line = 3 + (textwrap.dedent(setup) or 'pass').count('\n') + 1 + 2
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        run(1) # the first run creates caches, interned names... that are not the snippet's cost
+        # the value made by the last execution is still alive after the loop (in a variable
+        # of the loop), so we run 1 and number+1 executions and keep only the difference.
+        once, many = MemoryProbe(snapshots=True), MemoryProbe(snapshots=True)
+        run(1, once)
+        run(number + 1, many)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    def growth(probe): # {line: (bytes, blocks)} allocated during the loop and still alive
+        stats = probe.after.filter_traces(IGNORED).compare_to(probe.before.filter_traces(IGNORED), 'lineno')
+        return {stat.traceback[0]: (stat.size_diff, stat.count_diff) for stat in stats}
+
+    grown_once, grown_many = growth(once), growth(many)
+    per_line = {}
+    for frame, (size, blocks) in grown_many.items():
+        size_once, blocks_once = grown_once.get(frame, (0, 0))
+        per_line[frame] = ((size - size_once) / number, (blocks - blocks_once) / number)
+    lines = []
+    for frame, (size, blocks) in sorted(per_line.items(), key=lambda item: -item[1][0])[:top]:
+        if size <= 0:
+            break
+        if frame.filename == '<string>' and frame.lineno >= first_line:
+            where = f'code line {frame.lineno - first_line + 1}'
+        else:
+            where = f'{frame.filename}:{frame.lineno}'
+        lines.append((where, size, blocks))
+    return Memory(
+        peak=once.peak - once.start,
+        net=((many.end - many.start) - (once.end - once.start)) / number,
+        blocks=sum(blocks for _, blocks in per_line.values()), number=number, top=lines,
+    )
+
+def over_budget(memory, max_peak=None, max_net=None):
+    # the reasons why this run must fail, [] when it is within the budget
+    reasons = []
+    if max_peak is not None and memory.peak > max_peak:
+        reasons.append(f'peak {format_size(memory.peak)} > {format_size(max_peak)}')
+    if max_net is not None and memory.net > max_net:
+        reasons.append(f'net {format_size(memory.net)} > {format_size(max_net)} per execution')
+    return reasons
+
+def format_size(size):
+    for unit, scale in (('GiB', 2 ** 30), ('MiB', 2 ** 20), ('KiB', 2 ** 10)):
+        if abs(size) >= scale:
+            return f'{size / scale:.3g} {unit}'
+    return f'{size:.3g} B'
+
+def parse_size(text):
+    # '512', '64k', '2M', '1G' -> bytes
+    units = {'k': 2 ** 10, 'm': 2 ** 20, 'g': 2 ** 30}
+    text = text.strip().lower().rstrip('ib')
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def below_resolution(timing):
+    # the mean is not significantly above 0: the code costs no more than the empty loop,
+    # as far as the clock can tell
+    return timing.ci[0] <= 0
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds / 1e-9:.3g} ns'
+
+def report(timing):
+    low, high = timing.ci
+    p = timing.percentiles
+    return '\n'.join((
+        f'{timing.repeats} samples x {timing.number:,} loops'
+        f' (loop overhead {format_time(timing.overhead)} per loop, subtracted)',
+        f'  mean   {format_time(timing.average)}  +- {format_time(timing.stdev)}'
+        f'   95% ci [{format_time(low)}, {format_time(high)}]',
+        f'  min    {format_time(timing.min)}   median {format_time(timing.median)}',
+        f'  p5 {format_time(p[5])}   p25 {format_time(p[25])}'
+        f'   p75 {format_time(p[75])}   p95 {format_time(p[95])}',
+        *(['  below timer resolution: not measurably slower than the empty loop']
+          if below_resolution(timing) else []),
+        *memory_report(timing.memory),
+    ))
+
+def memory_report(memory):
+    if memory is None:
+        return []
+    lines = [
+        f'memory (tracemalloc, {memory.number} executions)',
+        f'  peak {format_size(memory.peak)}   per execution: net {format_size(memory.net)}'
+        f'   blocks kept {memory.blocks:.3g}',
+    ]
+    lines += [f'    {where}: {format_size(size)} in {blocks:.3g} blocks' for where, size, blocks in memory.top]
+    return lines
+
+#__________________________________________________________________________________________________
+# isolated runner: timeit() runs in our own process, so whatever a snippet leaves behind
+# (imports, a bigger heap, a warm cache) changes the next one, and the snippets run one
+# after the other. isolated() runs every benchmark in several fresh python processes
+# (`python timing.py --worker`, the job as json on stdin, the Timing back as json), many of
+# them at the same time, each one pinned to its own cpu when the OS lets us
+# (os.sched_setaffinity, linux only). the samples of all the processes of a benchmark are
+# merged into a single Timing, so the spread between processes shows in the stdev and ci.
+# note: processes running side by side still share the caches and the memory bus, for the
+# quietest numbers use jobs=1.
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def worker():
+    job = json.loads(sys.stdin.read())
+    cpu = job.pop('cpu')
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    # a snippet that prints must not get mixed with the result: while it runs, stdout goes
+    # to stderr (fd 1 itself, so even C code writing to it), and the result is written to a
+    # copy of the real stdout afterwards.
+    sys.stdout.flush()
+    result = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        timing = timeit(**job)
+    finally:
+        sys.stdout.flush()
+    with os.fdopen(result, 'w') as f:
+        f.write(json.dumps(timing._asdict()) + '\n')
+
+def run_worker(job, cpu=None):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'],
+                            input=json.dumps(dict(job, cpu=cpu)), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'the benchmark process failed:\n{result.stderr}')
+    return timing_of({'timing': json.loads(result.stdout.splitlines()[-1])}) # after 'Running timing.py file...'
+
+def merge(timings):
+    samples = [sample for timing in timings for sample in timing.samples]
+    merged = summarize(samples, timings[0].number, statistics.fmean(t.overhead for t in timings))
+    memories = [timing.memory for timing in timings if timing.memory]
+    return merged._replace(
+        elapsed=sum(t.elapsed for t in timings), # the numbers of loops may differ
+        memory=max(memories, key=lambda memory: memory.peak) if memories else None, # the worst process
+    )
+
+def isolated(benchmarks, processes=4, jobs=None, pin=True, **options):
+    # benchmarks: [(code, setup), ...] -> [Timing, ...] in the same order
+    # options:    passed to timeit() in every process (repeats, number, warmup, ...)
+    cpus = available_cpus()
+    jobs = jobs or len(cpus)
+    pin = pin and hasattr(os, 'sched_setaffinity')
+    free = queue.Queue() # the cpus not running a benchmark right now
+    for slot in range(jobs):
+        free.put(cpus[slot % len(cpus)] if pin else None)
+
+    def run(task):
+        index, job = task
+        cpu = free.get()
+        try:
+            return index, run_worker(job, cpu)
+        finally:
+            free.put(cpu)
+
+    # round after round, so every benchmark gets processes early and late in the run
+    tasks = [(index, dict(options, code=code, setup=setup))
+             for _ in range(processes) for index, (code, setup) in enumerate(benchmarks)]
+    results = [[] for _ in benchmarks]
+    with ThreadPoolExecutor(jobs) as pool: # threads, only waiting for their process
+        for index, timing in pool.map(run, tasks):
+            results[index].append(timing)
+    return [merge(timings) for timings in results]
+
+#__________________________________________________________________________________________________
+# history: every run from the terminal is saved in a json file, so we can compare it later
+# with another run, or with the runs made on another git revision. a run belongs to a
+# snippet (code + setup), a python version and a machine: we only compare like with like.
+HISTORY = '.timing_history.json'
+
+def environment():
+    return {
+        'python': f'{platform.python_implementation()} {platform.python_version()}',
+        'machine': f'{platform.node()} {platform.machine()}',
+    }
+
+def git_revision(rev='HEAD'):
+    # the short hash of rev, or None outside a git repo (or without git at all)
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', rev],
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def load_history(path=HISTORY):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def save_run(code, setup, timing, path=HISTORY):
+    runs = load_history(path)
+    run = {
+        'id': runs[-1]['id'] + 1 if runs else 1,
+        'code': code, 'setup': setup, **environment(), 'git': git_revision(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'timing': timing._asdict(),
+    }
+    runs.append(run)
+    tmp = path + '.tmp' # writing aside and renaming, so a crash never leaves half a file
+    with open(tmp, 'w') as f:
+        json.dump(runs, f, indent=1)
+    os.replace(tmp, path)
+    return run
+
+def timing_of(run):
+    fields = dict(run['timing'])
+    fields['percentiles'] = {int(k): v for k, v in fields['percentiles'].items()} # json keys are str
+    fields['ci'], fields['samples'] = tuple(fields['ci']), tuple(fields['samples'])
+    if fields.get('memory'): # json turned the Memory into a list
+        fields['memory'] = Memory(*fields['memory'])
+    return Timing(**fields)
+
+def snippet(run): # what makes two runs comparable
+    return run['code'], run['setup'], run['python'], run['machine']
+
+def welch(a, b):
+    # Welch's t-test of the two means (no need for equal variances). returns (t, degrees)
+    va, vb = a.stdev ** 2 / a.repeats, b.stdev ** 2 / b.repeats
+    if va + vb == 0:
+        return (0.0 if a.average == b.average else math.copysign(math.inf, b.average - a.average)), math.inf
+    t = (b.average - a.average) / math.sqrt(va + vb)
+    degrees = (va + vb) ** 2 / (va ** 2 / (a.repeats - 1) + vb ** 2 / (b.repeats - 1))
+    return t, degrees
+
+def relative_change(old, new):
+    # new / old - 1. an old mean of 0 or less (below the timer resolution) has no ratio:
+    # any cost is then infinitely more, and a lower one infinitely less
+    if old > 0:
+        return new / old - 1
+    return 0.0 if new == old else math.copysign(math.inf, new - old)
+
+def verdict(a, b, threshold=0.02):
+    # 'slower' or 'faster' only when the difference is both significant at 95% and bigger
+    # than the threshold (a real 0.5% change is rarely worth failing a build for).
+    if a.repeats < 2 or b.repeats < 2:
+        return 'too few samples', math.nan, math.nan
+    t, degrees = welch(a, b)
+    change = relative_change(a.average, b.average)
+    # rounding down the degrees: stricter. no variance at all gives infinite degrees: the normal law
+    critical = t_critical(max(1, int(degrees))) if math.isfinite(degrees) else 1.96
+    significant = abs(t) > critical
+    if significant and change > threshold:
+        return 'SLOWER', t, degrees
+    if significant and change < -threshold:
+        return 'faster', t, degrees
+    return 'same', t, degrees
+
+def run_id(ref):
+    # '#12' -> 12, the way runs are printed. anything else is a git revision (None), even
+    # when it is all digits like a short hash can be.
+    if ref.startswith('#') and ref[1:].isdigit():
+        return int(ref[1:])
+    return None
+
+def select(runs, ref):
+    # ref: a run id '#12' -> [that run], or a git revision -> the last run of each snippet on it
+    if run_id(ref) is not None:
+        return [run for run in runs if run['id'] == run_id(ref)]
+    rev = git_revision(ref) or ref
+    latest = {}
+    for run in runs:
+        if run['git'] and (run['git'].startswith(rev) or rev.startswith(run['git'])):
+            latest[snippet(run)] = run
+    return list(latest.values())
+
+def pairs(runs, old_ref=None, new_ref=None):
+    if old_ref is None: # the last two runs of every snippet
+        by_snippet = {}
+        for run in runs:
+            by_snippet.setdefault(snippet(run), []).append(run)
+        return [(found[-2], found[-1]) for found in by_snippet.values() if len(found) > 1]
+    old, new = select(runs, old_ref), select(runs, new_ref)
+    if run_id(old_ref) is not None and run_id(new_ref) is not None: # two runs asked by id, whatever they timed
+        return list(zip(old, new))
+    new_by_snippet = {snippet(run): run for run in new}
+    return [(run, new_by_snippet[snippet(run)]) for run in old if snippet(run) in new_by_snippet]
+
+def compare(argv):
+    parser = argparse.ArgumentParser(
+        prog='timing.py compare',
+        description='compares saved runs, exits with 1 if something got significantly slower.')
+    parser.add_argument('old', nargs='?', help="run id like '#12' (quoted, # starts a shell comment) or git"
+                                                " revision (default: the last two runs of each snippet).")
+    parser.add_argument('new', nargs='?', help="run id like '#12' or git revision.")
+    parser.add_argument('-t', '--threshold', type=float, default=0.02,
+                        help='smallest change that counts, 0.02 = 2%% (default).')
+    parser.add_argument('--history', default=HISTORY, help='json file with the saved runs.')
+    args = parser.parse_args(argv)
+    if (args.old is None) != (args.new is None):
+        parser.error('give both old and new, or neither of them')
+
+    found = pairs(load_history(args.history), args.old, args.new)
+    if not found:
+        print('nothing to compare')
+        return 2
+    slower = 0
+    for old, new in found:
+        a, b = timing_of(old), timing_of(new)
+        result, t, degrees = verdict(a, b, args.threshold)
+        slower += result == 'SLOWER'
+        print(f'#{old["id"]} ({old["git"]}) -> #{new["id"]} ({new["git"]})  {new["code"]}')
+        change = relative_change(a.average, b.average)
+        change = f'{change:+.1%}' if math.isfinite(change) else 'from below the timer resolution'
+        print(f'    {format_time(a.average)} -> {format_time(b.average)}  {change}'
+              f'   t={t:.2f} df={degrees:.1f}   {result}')
+        if snippet(old) != snippet(new):
+            print('    (not the same snippet, python or machine)')
+    return 1 if slower else 0
 
 #__________________________________________________________________________________________________
 # if we execute this module directly from the terminal, we can also get its functionality.
 
 # for that, we will just require to pass the arguments trought the terminal:
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['compare']: # python timing.py compare [old new]
+        sys.exit(compare(sys.argv[2:]))
+    if sys.argv[1:2] == ['--worker']: # a process started by isolated()
+        sys.exit(worker())
+
     parser = argparse.ArgumentParser(description=__doc__)
 
-    parser.add_argument('code', type=str, help='code snippet that we want to time.')
-    parser.add_argument('-r', '--repeats', type=int, default=1, help='n times to repeat.')
+    parser.add_argument('code', type=str, nargs='+', help='code snippets that we want to time.')
+    parser.add_argument('-r', '--repeats', type=int, default=7, help='n samples to measure (per process).')
+    parser.add_argument('-n', '--number', type=int, default=None,
+                        help='loops per sample (default: calibrated automatically).')
+    parser.add_argument('-s', '--setup', type=str, default='', help='code run before each sample, not timed.')
+    parser.add_argument('-w', '--warmup', type=int, default=1, help='samples run and thrown away first.')
+    parser.add_argument('--keep-gc', action='store_true', help='dont disable the garbage collector.')
+    parser.add_argument('--history', default=HISTORY, help='json file where the runs are saved.')
+    parser.add_argument('--no-save', action='store_true', help='dont save this run.')
+    parser.add_argument('-i', '--isolated', action='store_true',
+                        help='run every snippet in fresh processes, several at the same time.')
+    parser.add_argument('-p', '--processes', type=int, default=4, help='processes per snippet, with --isolated.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='processes running at the same time (default: one per cpu).')
+    parser.add_argument('--no-pin', action='store_true', help='dont pin each process to a cpu.')
+    parser.add_argument('--rigorous', action='store_true',
+                        help='isolated, with 3x more processes and 5x longer samples.')
+    parser.add_argument('-m', '--memory', action='store_true', help='also measure the allocations (tracemalloc).')
+    parser.add_argument('--max-peak', type=parse_size, default=None,
+                        help='fail (exit 1) if one execution needs more memory than this: 512, 64k, 2M...')
+    parser.add_argument('--max-net', type=parse_size, default=None,
+                        help='fail (exit 1) if one execution leaves more memory allocated than this.')
     args = parser.parse_args()
 
-    print(f'timing: {args.code}')
-    print(timeit(code=str(args.code), repeats=args.repeats))
+    budget = args.max_peak is not None or args.max_net is not None
+    options = dict(repeats=args.repeats, number=args.number, warmup=args.warmup,
+                   disable_gc=not args.keep_gc, memory=args.memory or budget)
+    if args.rigorous or args.isolated:
+        processes, min_time = (args.processes * 3, 0.1) if args.rigorous else (args.processes, 0.02)
+        timings = isolated([(code, args.setup) for code in args.code], processes, args.jobs,
+                           pin=not args.no_pin, min_time=min_time, **options)
+        where = f'  ({processes} fresh processes)'
+    else:
+        timings = [timeit(code, setup=args.setup, **options) for code in args.code]
+        where = ''
+
+    failed = False
+    for code, timing in zip(args.code, timings):
+        print(f'timing: {code}{where}')
+        print(report(timing))
+        if not args.no_save:
+            run = save_run(code, args.setup, timing, args.history)
+            print(f'saved as run #{run["id"]} in {args.history}')
+        if budget:
+            reasons = over_budget(timing.memory, args.max_peak, args.max_net)
+            for reason in reasons:
+                print(f'OVER BUDGET: {reason}')
+            failed = failed or bool(reasons)
+    if failed:
+        sys.exit(1)
 
     # executing `timing.py` module directly from terminal by using args:
     # Running timing.py file...
     # timing: [x**2 for x in range(10_000)]
-    # Timing(repeats=50, elapsed=0.13, average=0.00263233600)
+    # 7 samples x 50 loops (loop overhead 13.8 ns per loop, subtracted)
+    #   mean   762 us  +- 6.4 us   95% ci [756 us, 768 us]
+    #   min    752 us   median 760 us
+    #   p5 754 us   p25 760 us   p75 766 us   p95 770 us
+
+    # even tiny snippets: the empty loop costs ~8 ns per iteration, that is taken out.
+    # ~$ python timing.py "x + 1" -s "x = 5" -r 20
+    # 20 samples x 1,000,000 loops (loop overhead 7.6 ns per loop, subtracted)
+    #   mean   9.94 ns  +- 3.79 ns   95% ci [8.17 ns, 11.7 ns]
+    # and one that costs nothing more than the loop lands around 0 (some samples below):
+    # ~$ python timing.py "pass" -r 10
+    #   mean   0.0466 ns  +- 0.184 ns   95% ci [-0.0853 ns, 0.179 ns]
+    #   ...
+    #   below timer resolution: not measurably slower than the empty loop
+
+    # every run is saved, `compare` checks the last two runs of each snippet (or two run
+    # ids, or two git revisions). it exits with 1 when one got significantly slower, so it
+    # can stop a script or a git hook:
+    # ~$ python timing.py compare
+    # #1 (None) -> #2 (None)  [x**2 for x in range(10_000)]      (None: not in a git repo)
+    #     749 us -> 536 us  -28.4%   t=-7.95 df=7.2   faster
+    # ~$ python timing.py compare '#2' '#1'                       (run ids are quoted: # starts a shell comment)
+    #     536 us -> 749 us  +39.7% ...   SLOWER                  (and the exit code is 1)
+    # ~$ python timing.py compare HEAD~1 HEAD                    (the last runs made on each)
+
+    # several snippets, each one in 4 fresh processes pinned to the cpus:
+    # ~$ python timing.py "sorted(data)" "data.sort()" -s "import random; data = [random.random() for _ in range(1000)]" -i
+
+    # memory: the allocations next to the time (tracemalloc, in a separate pass), and a
+    # budget that fails the run (exit 1) when it is exceeded:
+    # ~$ python timing.py "cache.append([0] * 100)" -s "cache = []" --max-net 512
+    # ...
+    # memory (tracemalloc, 100 executions)
+    #   peak 976 B   per execution: net 864 B   blocks kept 2
+    #     code line 1: 864 B in 2 blocks
+    # OVER BUDGET: net 864 B > 512 B per execution
@@ -0,0 +1,173 @@
+import math
+import random
+from time import perf_counter
+
+# 02basic.py walks from the head to the last node on every insert, so building a list of
+# n nodes costs 1 + 2 + ... + n steps, O(n^2). 03.py keeps a tail, but only uses it when
+# the list is empty.
+
+# here the list keeps:
+#   tail   -> the last node, so append() links the new node right there, O(1)
+#   length -> updated on every insert, so len() doesnt need to count the nodes
+# and it can be used like a python list: for value in ll, len(ll), ll[i], ll[-1]
+
+# ll[i] still has to walk i nodes. with indexed=True the list also keeps a skip index: a
+# python list with every step-th node (step ~ log2 n). ll[i] jumps to the node i // step
+# and walks at most step nodes from there, O(log n). the index is built the first time it
+# is needed, and rebuilt after a prepend (appending keeps it valid, until the list grew so
+# much that the step is too short).
+
+class Node:
+	def __init__(self, value=None):
+		self.value = value
+		self.next = None
+
+class LinkedList:
+	def __init__(self, values=(), indexed=False):
+		self.head = None # HEAD -> node1 -> node2 -> node3 -> None
+		self.tail = None
+		self.length = 0
+		self.indexed = indexed
+		self.skip = None # [node 0, node step, node 2*step, ...], None when it must be rebuilt
+		self.step = 1
+		for value in values:
+			self.append(value)
+
+	def insert_node(self, new_node):
+		# like 02basic.py, but linking in the tail instead of walking to it
+		new_node.next = None
+		if self.head is None:
+			self.head = new_node
+		else:
+			self.tail.next = new_node
+		self.tail = new_node
+		if self.skip is not None and self.length % self.step == 0:
+			self.skip.append(new_node) # still every step-th node, the index stays valid
+		self.length += 1
+		if self.skip is not None and self.length >= 2 ** (self.step + 2):
+			self.skip = None # the list grew 4x since log2 n was picked, time for a longer step
+
+	def append(self, value):
+		self.insert_node(Node(value))
+
+	def prepend(self, value):
+		node = Node(value)
+		node.next = self.head
+		self.head = node
+		if self.tail is None:
+			self.tail = node
+		self.length += 1
+		self.skip = None # every position moved by one
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		node = self.head
+		while node:
+			yield node.value
+			node = node.next
+
+	display = __iter__ # the name 03.py uses
+
+	def _build_skip(self):
+		self.step = max(1, int(math.log2(self.length))) if self.length else 1
+		self.skip = []
+		node, i = self.head, 0
+		while node:
+			if i % self.step == 0:
+				self.skip.append(node)
+			node = node.next
+			i += 1
+
+	def node_at(self, i):
+		if i < 0:
+			i += self.length
+		if not 0 <= i < self.length:
+			raise IndexError('linked list index out of range')
+		if i == self.length - 1:
+			return self.tail
+		if self.indexed:
+			if self.skip is None:
+				self._build_skip()
+			node = self.skip[i // self.step]
+			walk = i % self.step
+		else:
+			node, walk = self.head, i
+		for _ in range(walk):
+			node = node.next
+		return node
+
+	def __getitem__(self, i):
+		return self.node_at(i).value
+
+	def __repr__(self):
+		return f'LinkedList([{", ".join(map(repr, self))}])'
+
+#_______________________________________________________________________________________
+ll = LinkedList(['a', 'b', 'c'])
+ll.prepend('z')
+ll.append('d')
+print(ll, len(ll)) # LinkedList(['z', 'a', 'b', 'c', 'd']) 5
+print(ll[0], ll[2], ll[-1]) # z b d
+print(list(ll.display())) # ['z', 'a', 'b', 'c', 'd']
+
+#_______________________________________________________________________________________
+class WalkingList: # the insert of 02basic.py
+	def __init__(self):
+		self.head = None
+
+	def insert_node(self, new_node):
+		if self.head is None:
+			self.head = new_node
+		else:
+			node = self.head
+			while node.next is not None:
+				node = node.next
+			node.next = new_node
+
+def timed(fn):
+	start = perf_counter()
+	fn()
+	return perf_counter() - start
+
+if __name__ == '__main__':
+	print('\nBENCHMARK: building a list of n nodes')
+	for n in (1_000, 10_000, 100_000):
+		def walking():
+			ll = WalkingList()
+			for i in range(n):
+				ll.insert_node(Node(i))
+		def with_tail():
+			ll = LinkedList()
+			for i in range(n):
+				ll.append(i)
+		walk = f'{timed(walking) * 1000:9.1f} ms' if n <= 10_000 else '     skipped' # 100k would take minutes
+		print(f'n={n:>7,}  walking to the end {walk}   tail {timed(with_tail) * 1000:7.1f} ms')
+
+	print('\nBENCHMARK: 10,000 random ll[i]')
+	for n in (1_000, 10_000, 100_000):
+		positions = [random.randrange(n) for _ in range(10_000)]
+		values = list(range(n))
+		plain, indexed = LinkedList(values), LinkedList(values, indexed=True)
+		indexed[0] # building the index is not part of the lookups
+		walk = timed(lambda: [plain[i] for i in positions])
+		skip = timed(lambda: [indexed[i] for i in positions])
+		print(f'n={n:>7,}  walking {walk * 1000:8.1f} ms   skip index (step {indexed.step:>2}) {skip * 1000:6.1f} ms'
+			  f'   python list {timed(lambda: [values[i] for i in positions]) * 1000:4.1f} ms')
+
+
+# BENCHMARK: building a list of n nodes
+# n=  1,000  walking to the end       9.5 ms   tail     0.5 ms
+# n= 10,000  walking to the end     818.7 ms   tail     6.9 ms
+# n=100,000  walking to the end      skipped   tail    77.7 ms
+
+# BENCHMARK: 10,000 random ll[i]
+# n=  1,000  walking    127.5 ms   skip index (step  9)    6.3 ms   python list  0.2 ms
+# n= 10,000  walking   1310.6 ms   skip index (step 13)    4.9 ms   python list  0.2 ms
+# n=100,000  walking  13168.0 ms   skip index (step 16)   15.2 ms   python list  0.7 ms
+
+# building: the tail makes it linear, 10x more nodes take 10x longer (the walking insert
+# takes 100x longer). lookups: the skip index walks at most ~log2 n nodes, so 10k random
+# ll[i] stay in the milliseconds while walking from the head grows with n. a python list
+# is still 20x faster, a linked list is for cheap inserts, not for positions.
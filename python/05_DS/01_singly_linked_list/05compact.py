@@ -0,0 +1,219 @@
+import tracemalloc
+from array import array
+from time import perf_counter
+
+# every Node of 01basic.py .. 04indexed.py is a full python object with its own __dict__:
+# 88 bytes in python 3.11, ~150 in older versions, for just two fields (value and next).
+# with millions of nodes that adds up.
+
+# two ways to make them smaller:
+#   1. __slots__: the fields live in fixed places inside the object, there is no __dict__.
+#   2. no node objects at all (PoolLinkedList): the list keeps two parallel arrays, node i
+#      is values[i] and next[i], and a "pointer" is just the index of the next node (-1 is
+#      None). the places freed by popleft() go into a free list and are reused by the next
+#      inserts, like a memory pool.
+# both lists below have the same API: append, prepend, popleft, len, iter, [i].
+
+NIL = -1 # the None of PoolLinkedList
+
+class Node:
+	__slots__ = ('value', 'next')
+
+	def __init__(self, value=None):
+		self.value = value
+		self.next = None
+
+class LinkedList:
+	def __init__(self, values=()):
+		self.head = None
+		self.tail = None
+		self.length = 0
+		for value in values:
+			self.append(value)
+
+	def append(self, value):
+		node = Node(value)
+		if self.head is None:
+			self.head = node
+		else:
+			self.tail.next = node
+		self.tail = node
+		self.length += 1
+
+	def prepend(self, value):
+		node = Node(value)
+		node.next = self.head
+		self.head = node
+		if self.tail is None:
+			self.tail = node
+		self.length += 1
+
+	def popleft(self):
+		if self.head is None:
+			raise IndexError('pop from an empty linked list')
+		node = self.head
+		self.head = node.next
+		if self.head is None:
+			self.tail = None
+		self.length -= 1
+		return node.value
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		node = self.head
+		while node:
+			yield node.value
+			node = node.next
+
+	def __getitem__(self, i):
+		if i < 0:
+			i += self.length
+		if not 0 <= i < self.length:
+			raise IndexError('linked list index out of range')
+		node = self.head
+		for _ in range(i):
+			node = node.next
+		return node.value
+
+class PoolLinkedList:
+	def __init__(self, values=()):
+		self.values = []       # values[i] -> the value of node i
+		self.next = array('q') # next[i]   -> the index of the node after i, or NIL
+		self.free = array('q') # indexes of the popped nodes, ready to be reused
+		self.head = NIL
+		self.tail = NIL
+		self.length = 0
+		for value in values:
+			self.append(value)
+
+	def _new_node(self, value):
+		if self.free:
+			i = self.free.pop()
+			self.values[i] = value
+			self.next[i] = NIL
+		else:
+			i = len(self.values)
+			self.values.append(value)
+			self.next.append(NIL)
+		return i
+
+	def append(self, value):
+		i = self._new_node(value)
+		if self.head == NIL:
+			self.head = i
+		else:
+			self.next[self.tail] = i
+		self.tail = i
+		self.length += 1
+
+	def prepend(self, value):
+		i = self._new_node(value)
+		self.next[i] = self.head
+		self.head = i
+		if self.tail == NIL:
+			self.tail = i
+		self.length += 1
+
+	def popleft(self):
+		if self.head == NIL:
+			raise IndexError('pop from an empty linked list')
+		i = self.head
+		value = self.values[i]
+		self.values[i] = None # not keeping the value alive
+		self.head = self.next[i]
+		if self.head == NIL:
+			self.tail = NIL
+		self.free.append(i)
+		self.length -= 1
+		return value
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		values, next_ = self.values, self.next
+		i = self.head
+		while i != NIL:
+			yield values[i]
+			i = next_[i]
+
+	def __getitem__(self, i):
+		if i < 0:
+			i += self.length
+		if not 0 <= i < self.length:
+			raise IndexError('linked list index out of range')
+		j = self.head
+		for _ in range(i):
+			j = self.next[j]
+		return self.values[j]
+
+#_______________________________________________________________________________________
+for cls in (LinkedList, PoolLinkedList):
+	ll = cls(['a', 'b', 'c'])
+	ll.prepend('z')
+	print(ll.popleft(), ll.popleft()) # z a
+	ll.append('d') # reuses a freed place in PoolLinkedList
+	print(list(ll), len(ll), ll[-1]) # ['b', 'c', 'd'] 3 d
+
+#_______________________________________________________________________________________
+class DictNode: # the Node of 01basic.py .. 04indexed.py
+	def __init__(self, value=None):
+		self.value = value
+		self.next = None
+
+class DictLinkedList(LinkedList):
+	def append(self, value):
+		node = DictNode(value)
+		if self.head is None:
+			self.head = node
+		else:
+			self.tail.next = node
+		self.tail = node
+		self.length += 1
+
+def allocated(fn):
+	# bytes allocated by fn() that are still alive when it returns
+	tracemalloc.start()
+	result = fn()
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del result
+	return size
+
+def timed(fn):
+	start = perf_counter()
+	fn()
+	return perf_counter() - start
+
+if __name__ == '__main__':
+	n = 1_000_000
+	values = list(range(n)) # the values exist already, we only measure the list itself
+	print(f'\nBENCHMARK: {n:,} nodes')
+	for label, cls in (('Node with __dict__', DictLinkedList), ('Node with __slots__', LinkedList),
+					   ('PoolLinkedList', PoolLinkedList)):
+		size = allocated(lambda: cls(values))
+		build = timed(lambda: cls(values))
+		ll = cls(values)
+		iterate = timed(lambda: sum(ll))
+
+		def churn(): # a queue that keeps its size: pop one, append one
+			for value in values:
+				ll.popleft()
+				ll.append(value)
+		print(f'{label:<20} {size / n:5.1f} bytes/node   build {build * 1000:5.0f} ms'
+			  f'   iterate {iterate * 1000:4.0f} ms   popleft+append {timed(churn) * 1000:5.0f} ms')
+		del ll
+
+# BENCHMARK: 1,000,000 nodes
+# Node with __dict__    88.0 bytes/node   build  1180 ms   iterate   49 ms   popleft+append   636 ms
+# Node with __slots__   48.0 bytes/node   build   881 ms   iterate   49 ms   popleft+append   608 ms
+# PoolLinkedList        16.6 bytes/node   build   471 ms   iterate   88 ms   popleft+append   933 ms
+
+# __slots__ is almost free: the nodes are 45% smaller and a bit faster to create, every
+# other operation is the same. the pool is 5x smaller than the dict nodes and builds 2.5x
+# faster (two appends to growing arrays instead of one new object per node). but every
+# step through it is an array lookup plus an int object for the index, so iterating and
+# the pop/append churn are slower than following real references.
+# __slots__ for the everyday list, the pool when the memory is what runs out.
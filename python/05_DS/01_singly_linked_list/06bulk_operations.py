@@ -0,0 +1,245 @@
+import random
+from operator import gt, lt
+from time import perf_counter
+
+# the lists so far only add one node at a time. here the whole-list operations, all done
+# by relinking the nodes we already have:
+#   extend(values) -> builds the new chain with local variables and links it once
+#   splice(other)  -> moves all the nodes of other to our end: one link, O(1), whatever the size
+#   reverse()      -> turns every next pointer around, no new nodes
+#   sort()         -> merge sort on the nodes themselves, stable, no python list involved
+
+class Node:
+	__slots__ = ('value', 'next')
+
+	def __init__(self, value=None):
+		self.value = value
+		self.next = None
+
+class LinkedList:
+	def __init__(self, values=()):
+		self.head = None
+		self.tail = None
+		self.length = 0
+		self.extend(values)
+
+	def append(self, value):
+		node = Node(value)
+		if self.head is None:
+			self.head = node
+		else:
+			self.tail.next = node
+		self.tail = node
+		self.length += 1
+
+	def _link(self, first, last, count):
+		# puts the chain first -> ... -> last (count nodes) at our end
+		if self.head is None:
+			self.head = first
+		else:
+			self.tail.next = first
+		self.tail = last
+		self.length += count
+
+	def extend(self, values):
+		dummy = tail = Node() # the new chain hangs from it while we build it
+		count = 0
+		for value in values:
+			tail.next = tail = Node(value)
+			count += 1
+		if count:
+			self._link(dummy.next, tail, count)
+
+	def splice(self, other):
+		# moves the nodes, other is empty afterwards
+		if other is self:
+			raise ValueError('cannot splice a list into itself')
+		if other.head is not None:
+			self._link(other.head, other.tail, other.length)
+			other.head = other.tail = None
+			other.length = 0
+
+	def reverse(self):
+		previous, node = None, self.head
+		self.tail = node
+		while node:
+			node.next, previous, node = previous, node, node.next
+		self.head = previous
+
+	def sort(self, key=None, reverse=False):
+		# bottom-up merge sort: merges runs of 1 node into sorted runs of 2, then 4, 8...
+		# each pass walks the whole chain once, log2 n passes, no extra memory.
+		# with a key, like list.sort, key() runs once per value and not at every comparison:
+		# while sorting every node holds its key, the values wait in a dict by node (so a key
+		# costs O(n) extra memory, list.sort keeps its keys aside too).
+		if self.length < 2:
+			return
+		if key is None:
+			self._sort(reverse)
+			return
+		values = {}
+		node = self.head
+		try:
+			while node:
+				values[node] = node.value
+				node.value = key(node.value)
+				node = node.next
+			self._sort(reverse)
+		finally:
+			for node, value in values.items():
+				node.value = value
+
+	def _sort(self, reverse):
+		first = gt if reverse else lt # first(x, y): must x go before y?
+		if in_order(self.head, first): # one cheap walk saves all the passes
+			return
+		dummy = Node()
+		dummy.next = self.head
+		width = 1
+		while width < self.length:
+			tail, node = dummy, dummy.next
+			while node:
+				left = node
+				right = cut(left, width)
+				node = cut(right, width)
+				tail = merge(left, right, tail, first)
+			width *= 2
+		self.head, self.tail = dummy.next, tail
+
+	def __len__(self):
+		return self.length
+
+	def __iter__(self):
+		node = self.head
+		while node:
+			yield node.value
+			node = node.next
+
+	def __repr__(self):
+		return f'LinkedList([{", ".join(map(repr, self))}])'
+
+def in_order(node, first):
+	previous = node.value
+	node = node.next
+	while node:
+		if first(node.value, previous):
+			return False
+		previous = node.value
+		node = node.next
+	return True
+
+def cut(node, n):
+	# keeps n nodes starting at node, cuts the chain there and returns the rest
+	for _ in range(n - 1):
+		if node is None:
+			return None
+		node = node.next
+	if node is None:
+		return None
+	rest, node.next = node.next, None
+	return rest
+
+def merge(a, b, tail, first):
+	# links the sorted chains a and b, merged, after tail. returns the new tail.
+	# on a tie a goes first, a came first in the list: that keeps the sort stable.
+	while a and b:
+		if first(b.value, a.value):
+			tail.next = tail = b
+			b = b.next
+		else:
+			tail.next = tail = a
+			a = a.next
+	tail.next = a or b
+	while tail.next:
+		tail = tail.next
+	return tail
+
+#_______________________________________________________________________________________
+ll = LinkedList([3, 1, 2])
+ll.extend([5, 4])
+other = LinkedList(['b', 'a'])
+other.splice(LinkedList(['c']))
+print(ll, other) # LinkedList([3, 1, 2, 5, 4]) LinkedList(['b', 'a', 'c'])
+ll.sort()
+print(ll) # LinkedList([1, 2, 3, 4, 5])
+ll.reverse()
+print(ll, ll.tail.value) # LinkedList([5, 4, 3, 2, 1]) 1
+
+cars = LinkedList([('ford', 1970), ('fiat', 1982), ('audi', 1970), ('bmw', 1982)])
+cars.sort(key=lambda car: car[1], reverse=True) # stable: same year, same order as before
+print(list(cars)) # [('fiat', 1982), ('bmw', 1982), ('ford', 1970), ('audi', 1970)]
+
+#_______________________________________________________________________________________
+def timed(fn, repeats=3):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		fn()
+		best = min(best, perf_counter() - start)
+	return best
+
+def compare(label, bulk, rebuild):
+	bulk, rebuild = timed(bulk), timed(rebuild)
+	print(f'{label:<22} bulk {bulk * 1000:8.2f} ms   baseline {rebuild * 1000:8.2f} ms'
+		  f'   {rebuild / bulk:5.1f}x')
+
+if __name__ == '__main__':
+	n = 200_000
+	values = [random.random() for _ in range(n)]
+	print(f'\nBENCHMARK: {n:,} nodes')
+	# baselines: append() one by one for extend, and for the others the python list way:
+	# copying the values out to a list, working on it, and building a new chain from it.
+
+	def one_by_one():
+		ll = LinkedList()
+		for value in values:
+			ll.append(value)
+	compare('extend', lambda: LinkedList().extend(values), one_by_one)
+
+	def splice():
+		a, b = LinkedList(values), LinkedList(values)
+		start = perf_counter()
+		a.splice(b)
+		return perf_counter() - start
+	def splice_rebuild():
+		a, b = LinkedList(values), LinkedList(values)
+		start = perf_counter()
+		LinkedList(list(a) + list(b))
+		return perf_counter() - start
+	splice_time = min(splice() for _ in range(3))
+	rebuild_time = min(splice_rebuild() for _ in range(3))
+	print(f'{"splice":<22} bulk {splice_time * 1000:8.2f} ms   baseline {rebuild_time * 1000:8.2f} ms'
+		  f'   {rebuild_time / splice_time:5.0f}x')
+
+	ll = LinkedList(values)
+	compare('reverse', ll.reverse, lambda: LinkedList(reversed(list(ll))))
+
+	for label, data in (('sort, random', values), ('sort, already sorted', sorted(values)),
+						('sort, with a key', values)):
+		key = (lambda value: -value) if 'key' in label else None
+		def in_place():
+			LinkedList(data).sort(key=key)
+		def rebuild():
+			LinkedList(sorted(LinkedList(data), key=key))
+		building = timed(lambda: LinkedList(data)) # both build the starting list, not part of the sort
+		in_place_time, rebuild_time = timed(in_place) - building, timed(rebuild) - building
+		print(f'{label:<22} bulk {in_place_time * 1000:8.2f} ms   baseline {rebuild_time * 1000:8.2f} ms'
+			  f'   {rebuild_time / in_place_time:5.1f}x')
+
+# BENCHMARK: 200,000 nodes
+# extend                 bulk   129.55 ms   baseline   138.66 ms     1.1x
+# splice                 bulk     0.01 ms   baseline   351.13 ms   32285x
+# reverse                bulk    17.35 ms   baseline   118.89 ms     6.9x
+# sort, random           bulk   963.65 ms   baseline   252.03 ms     0.3x
+# sort, already sorted   bulk    42.83 ms   baseline   248.15 ms     5.8x
+# sort, with a key       bulk  1077.29 ms   baseline   340.98 ms     0.3x
+
+# extend only saves the attribute updates of append(), ~10%. splice doesnt depend on the
+# size at all, and reverse is 7x faster than going through a python list: neither of them
+# creates a single node.
+# the merge sort loses: every comparison and every link is a python bytecode, against
+# Timsort running in C on a python list, so copying out, sorting and rebuilding is 3-4x
+# faster. with a key the gap stays the same: key() runs once per node, like in list.sort
+# (calling it at every comparison, 2 n log2 n calls, made it 0.2x). the in place sort is
+# still the one to use when other code keeps references to the nodes, or when there is no
+# memory for a second copy. and when the list is already sorted it only walks it once.
@@ -0,0 +1,137 @@
+import queue
+import threading
+from time import monotonic, perf_counter
+
+# the linked lists so far are not thread safe: two threads appending at the same time can
+# both read the same tail, and one of the nodes is lost. to use one as a producer/consumer
+# queue between threads (like in concepts/threading) it needs locks.
+
+# ConcurrentQueue is the two-lock queue (Michael & Scott): put() links at the tail and only
+# takes the tail lock, get() unlinks at the head and only takes the head lock, so a
+# producer and a consumer never wait for each other.
+# the trick is a dummy node: head always points to a node that was already consumed (or to
+# the dummy at the start), the first real value is head.next. so the head and the tail are
+# never the same node to change, even when the queue has a single value.
+# when the queue is empty get() waits on a Condition of the head lock (with an optional
+# timeout), or doesnt wait at all (get_nowait), and raises queue.Empty like queue.Queue.
+# put() only takes the head lock to wake a consumer up when one is actually waiting.
+
+class Node:
+	__slots__ = ('value', 'next')
+
+	def __init__(self, value=None):
+		self.value = value
+		self.next = None
+
+class ConcurrentQueue:
+	def __init__(self):
+		self.head = self.tail = Node() # the dummy
+		self.head_lock = threading.Lock()
+		self.tail_lock = threading.Lock()
+		self.not_empty = threading.Condition(self.head_lock)
+		self.waiting = 0 # consumers waiting in get(), only changed under the head lock
+
+	def put(self, value):
+		node = Node(value)
+		with self.tail_lock:
+			self.tail.next = node
+			self.tail = node
+		# read after linking: a consumer counts itself as waiting before it looks at
+		# head.next, so either we see it here, or it sees the new node.
+		if self.waiting:
+			with self.head_lock:
+				self.not_empty.notify()
+
+	def get(self, block=True, timeout=None):
+		with self.head_lock:
+			if block and self.head.next is None:
+				deadline = None if timeout is None else monotonic() + timeout
+				self.waiting += 1
+				try:
+					while self.head.next is None:
+						remaining = None if deadline is None else deadline - monotonic()
+						if remaining is not None and remaining <= 0:
+							break
+						self.not_empty.wait(remaining)
+				finally:
+					self.waiting -= 1
+			node = self.head.next
+			if node is None:
+				raise queue.Empty
+			self.head = node # it becomes the new dummy
+		value, node.value = node.value, None # the dummy shouldnt keep the value alive
+		return value
+
+	def get_nowait(self):
+		return self.get(block=False)
+
+	def empty(self): # only a hint: another thread may put or get right after
+		return self.head.next is None
+
+#_______________________________________________________________________________________
+q = ConcurrentQueue()
+q.put('a')
+q.put('b')
+print(q.get(), q.get_nowait(), q.empty()) # a b True
+try:
+	q.get(timeout=0.1)
+except queue.Empty:
+	print('empty after 0.1 sec')
+
+#_______________________________________________________________________________________
+# benchmark: producers put n values in total, consumers take them until they get a None.
+STOP = None
+
+def run(q, producers, consumers, n):
+	per_producer = n // producers
+	received = [0] * consumers
+
+	def produce():
+		for i in range(per_producer):
+			q.put(i)
+
+	def consume(k):
+		count = 0
+		while q.get() is not STOP:
+			count += 1
+		received[k] = count
+
+	consuming = [threading.Thread(target=consume, args=(k,)) for k in range(consumers)]
+	producing = [threading.Thread(target=produce) for _ in range(producers)]
+	start = perf_counter()
+	for thread in consuming + producing:
+		thread.start()
+	for thread in producing:
+		thread.join()
+	for _ in consuming:
+		q.put(STOP)
+	for thread in consuming:
+		thread.join()
+	elapsed = perf_counter() - start
+	assert sum(received) == per_producer * producers # nothing lost, nothing twice
+	return per_producer * producers / elapsed
+
+if __name__ == '__main__':
+	n = 400_000
+	print(f'\nBENCHMARK: {n:,} values')
+	for producers, consumers in ((1, 1), (2, 2), (4, 4), (8, 2), (2, 8)):
+		ours = run(ConcurrentQueue(), producers, consumers, n)
+		theirs = run(queue.Queue(), producers, consumers, n)
+		print(f'{producers} producers, {consumers} consumers   ConcurrentQueue {ours:>9,.0f} /sec'
+			  f'   queue.Queue {theirs:>9,.0f} /sec   {ours / theirs:4.2f}x')
+
+# BENCHMARK: 400,000 values
+# 1 producers, 1 consumers   ConcurrentQueue   355,336 /sec   queue.Queue   298,520 /sec   1.19x
+# 2 producers, 2 consumers   ConcurrentQueue   412,698 /sec   queue.Queue   267,450 /sec   1.54x
+# 4 producers, 4 consumers   ConcurrentQueue   459,303 /sec   queue.Queue   261,263 /sec   1.76x
+# 8 producers, 2 consumers   ConcurrentQueue   480,411 /sec   queue.Queue   268,512 /sec   1.79x
+# 2 producers, 8 consumers   ConcurrentQueue   333,814 /sec   queue.Queue   263,325 /sec   1.27x
+
+# with the GIL only one thread runs at a time, so the two locks dont make anything run in
+# parallel. the gain comes from doing less per value: queue.Queue takes one mutex and
+# notifies a Condition on every put and every get, here put() only touches the tail lock
+# and wakes someone up only when a consumer is actually waiting.
+# a first version counted the values with a threading.Semaphore, which is written in python
+# on top of a Condition: it ran at 0.6x-0.8x of queue.Queue.
+# with many consumers they are often waiting, so more puts pay for the wake up (2 producers,
+# 8 consumers).
@@ -0,0 +1,173 @@
+import csv
+import itertools
+import os
+import tempfile
+from time import perf_counter
+
+# the generic pipeline (03.generic_pipeline.py) pulls one row at a time. every row pays
+# for a generator frame resume in each stage and a new list allocation from csv.reader.
+
+# instead of pulling rows, we can pull blocks of N rows and let every stage work on a
+# whole block at once. the generator machinery then runs once per block, and the inner
+# loops become list comprehensions instead of generator hops.
+
+# per-row version (same as 03.generic_pipeline.py):
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+# batch version, row oriented: each item is a list of up to `size` rows.
+def parse_batches(fname, size=100):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		reader = csv.reader(f, dialect=dialect)
+		while True:
+			batch = list(itertools.islice(reader, size)) # pull `size` rows at once
+			if not batch:
+				break
+			yield batch
+
+def filter_batches(batches, word):
+	for batch in batches:
+		batch = [row for row in batch if word in row[0]] # one comprehension per block
+		if batch: # dont send empty blocks downstream
+			yield batch
+
+#_______________________________________________________________________________________
+# batch version, column oriented: each item is a tuple of columns.
+#   (('Chevrolet Chevelle Malibu', 'Buick Skylark 320', ...), ('18.0', '15.0', ...), ...)
+# filters only need to scan columns[0], and the other columns are just gathered by index.
+def parse_columns(fname, size=100):
+	for batch in parse_batches(fname, size):
+		yield tuple(zip(*batch)) # transposing rows into columns
+
+def filter_columns(blocks, word):
+	for columns in blocks:
+		keep = [i for i, value in enumerate(columns[0]) if word in value]
+		if keep:
+			yield tuple([column[i] for i in keep] for column in columns)
+
+#_______________________________________________________________________________________
+# flattening blocks back into rows, so the consumers of pipeline() dont need to change.
+def unbatch(batches):
+	for batch in batches:
+		yield from batch
+
+def uncolumn(blocks):
+	for columns in blocks:
+		yield from map(list, zip(*columns))
+
+def pipeline(fname, *filter_words, batch_size=None, columns=False):
+	if batch_size is None: # per-row chain, exactly like 03.generic_pipeline.py
+		data = parse_data(fname)
+		for word in filter_words:
+			data = filter_data(data, word)
+		return data
+
+	if columns:
+		data = parse_columns(fname, batch_size)
+		for word in filter_words:
+			data = filter_columns(data, word)
+		return data
+
+	data = parse_batches(fname, batch_size)
+	for word in filter_words:
+		data = filter_batches(data, word)
+	return data
+
+print('\nBATCHED PIPELINE: (Chevrolet, Monte, Landau)')
+for batch in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', batch_size=100):
+	print(batch)
+# [['Chevrolet Monte Carlo Landau', '15.5', '8', '350.0', ...],
+#  ['Chevrolet Monte Carlo Landau', '19.2', '8', '305.0', ...]]
+
+print('\nCOLUMNAR PIPELINE: (Chevrolet, Monte, Landau)')
+for columns in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', batch_size=100, columns=True):
+	print(columns)
+# (['Chevrolet Monte Carlo Landau', 'Chevrolet Monte Carlo Landau'], ['15.5', '19.2'], ...)
+
+# same rows no matter which mode we use:
+per_row = list(pipeline('cars.csv', 'Chevrolet'))
+batched = list(unbatch(pipeline('cars.csv', 'Chevrolet', batch_size=64)))
+columnar = list(uncolumn(pipeline('cars.csv', 'Chevrolet', batch_size=64, columns=True)))
+print(per_row == batched == columnar) # True
+
+#_______________________________________________________________________________________
+# benchmark: rows/sec of the per-row generator chain vs the batched ones.
+# cars.csv only has ~400 rows, so we build a bigger file by repeating its rows.
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+def rows_per_sec(fname, n_rows, *filter_words, repeats=3, **options):
+	best = float('inf')
+	for _ in range(repeats): # best of `repeats` runs, to filter out noise
+		start = perf_counter()
+		for _ in pipeline(fname, *filter_words, **options):
+			pass
+		best = min(best, perf_counter() - start)
+	return n_rows / best
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 500)
+	try:
+		# selective filters drop almost every row at the first stage, permissive ones
+		# let most rows travel through the whole chain.
+		for words in (('Chevrolet', 'Monte', 'Landau'), ('o', 'e', 'r')):
+			print(f'\nBENCHMARK: {n_rows:,} rows, filters {words}')
+			speed = rows_per_sec(big, n_rows, *words)
+			print(f'per-row chain          {speed:>12,.0f} rows/sec')
+			for size in (100, 1000, 10_000):
+				speed = rows_per_sec(big, n_rows, *words, batch_size=size)
+				print(f'batches of {size:<6}      {speed:>12,.0f} rows/sec')
+			for size in (100, 1000, 10_000):
+				speed = rows_per_sec(big, n_rows, *words, batch_size=size, columns=True)
+				print(f'columns of {size:<6}      {speed:>12,.0f} rows/sec')
+	finally:
+		os.remove(big)
+
+
+# BENCHMARK: 203,500 rows, filters ('Chevrolet', 'Monte', 'Landau')
+# per-row chain             1,047,669 rows/sec
+# batches of 100              966,372 rows/sec
+# batches of 1000             824,438 rows/sec
+# batches of 10000            590,745 rows/sec
+# columns of 100              803,915 rows/sec
+# columns of 1000             590,602 rows/sec
+# columns of 10000            430,998 rows/sec
+
+# BENCHMARK: 203,500 rows, filters ('o', 'e', 'r')
+# per-row chain               809,487 rows/sec
+# batches of 100              812,719 rows/sec
+# batches of 1000             676,108 rows/sec
+# batches of 10000            607,806 rows/sec
+# columns of 100              471,338 rows/sec
+# columns of 1000             426,906 rows/sec
+# columns of 10000            297,590 rows/sec
+
+# the numbers are noisy, but the lesson is clear: batching alone doesnt buy us much.
+# resuming a generator is cheap (Python 3.11), and almost all the time is spent inside
+# csv.reader splitting every line into a list. batching only removes the part we were
+# not paying much for. small blocks (~100 rows) are on par with the per-row chain,
+# bigger blocks get slower because they no longer fit in the CPU caches, and the
+# columnar layout also pays for transposing every block.
+# blocks start to pay off once the stages do real work per block (see the fused filter,
+# typed columns and column projection that build on top of these blocks).
@@ -0,0 +1,259 @@
+import csv
+import re
+from collections import Counter, deque
+from time import perf_counter
+
+# pipeline(fname, *filter_words) in 03.generic_pipeline.py wraps one filter_data generator
+# per word. with K words every row that survives travels through K generator frames and
+# `row[0]` gets scanned K times, once per stage.
+
+# instead, we can compile all the words into a single matcher and use it in a single
+# filter stage, so each row goes through one generator frame no matter how many words.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+# Aho-Corasick automaton: a trie of all the words plus "fail" links, so we can find every
+# word inside a text in one left-to-right pass, no matter how many words we have.
+class AhoCorasick:
+	def __init__(self, words):
+		self.words = tuple(words)
+		self.goto = [{}] # state -> {char: next state}, state 0 is the root
+		self.fail = [0]  # state -> longest proper suffix that is also a state
+		self.out = [0]   # state -> bitmask of the words that end in this state
+
+		for i, word in enumerate(self.words):
+			state = 0
+			for char in word:
+				if char not in self.goto[state]:
+					self.goto[state][char] = len(self.goto)
+					self.goto.append({})
+					self.fail.append(0)
+					self.out.append(0)
+				state = self.goto[state][char]
+			self.out[state] |= 1 << i
+
+		# breadth first, so the fail state of a node is always ready before its children
+		queue = deque(self.goto[0].values())
+		while queue:
+			state = queue.popleft()
+			for char, child in self.goto[state].items():
+				queue.append(child)
+				fail = self.fail[state]
+				while fail and char not in self.goto[fail]:
+					fail = self.fail[fail]
+				self.fail[child] = self.goto[fail].get(char, 0)
+				self.out[child] |= self.out[self.fail[child]]
+
+	def search(self, text):
+		# bitmask of every word found inside text
+		goto, fail, out = self.goto, self.fail, self.out
+		state = found = 0
+		for char in text:
+			while state and char not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(char, 0)
+			found |= out[state]
+		return found
+
+AhoCorasick(['he', 'she', 'his', 'hers']).search('ushers') # 0b1011  (he, she, hers)
+
+#_______________________________________________________________________________________
+def prune_words(words):
+	# duplicated words, and words that are contained inside another word, can never change
+	# the result of an `all` match: if 'Monte Carlo' is in the text, 'Monte' is in it too.
+	# the order of the caller is kept, it decides which word is checked first.
+	words = list(dict.fromkeys(words))
+	return [word for word in words
+			if not any(word != other and word in other for other in words)]
+
+def scan_source(words, mode):
+	# the words that matter for the mode, and the source code of the plain scan on `text`,
+	# with every word bound to a name (the namespace to compile it in):
+	#   ['Chevrolet', 'Monte'] -> {'w0': 'Chevrolet', 'w1': 'Monte'}, 'w0 in text and w1 in text'
+	# the test is '' when there are no words.
+	if mode not in ('all', 'any'):
+		raise ValueError(f'unknown mode {mode!r}')
+	words = prune_words(words) if mode == 'all' else list(dict.fromkeys(words))
+	names = {f'w{i}': word for i, word in enumerate(words)}
+	joiner = ' and ' if mode == 'all' else ' or '
+	return words, names, joiner.join(f'{name} in text' for name in names)
+
+def compile_matcher(words, mode='all', method='scan'):
+	# returns a function text -> bool.
+	#   mode='all' : every word must be in the text (same result as the chained filters)
+	#   mode='any' : at least one word must be in the text
+	words, names, test = scan_source(words, mode)
+	if not words:
+		return lambda text: True
+
+	if method == 'scan':
+		# we write the source code of the test ourselves and compile it, the same trick
+		# namedtuple uses. with the words (w0, w1, w2) it becomes:
+		#   lambda text: w0 in text and w1 in text and w2 in text
+		# so there is no loop and no generator frame between the words at all.
+		return eval(compile('lambda text: ' + test, '<matcher>', 'eval'), names)
+
+	if method == 'regex':
+		# the whole scan runs inside the C regex engine.
+		escaped = [re.escape(word) for word in words]
+		if mode == 'all':
+			# one lookahead per word, the match fails as soon as one word is missing
+			pattern = re.compile(''.join(f'(?=.*?{word})' for word in escaped), re.S)
+			return pattern.match
+		return re.compile('|'.join(escaped)).search
+
+	if method == 'aho':
+		automaton = AhoCorasick(words)
+		if mode == 'all':
+			everything = (1 << len(words)) - 1
+			return lambda text: automaton.search(text) == everything
+		return automaton.search
+
+	raise ValueError(f'unknown method {method!r}')
+
+#_______________________________________________________________________________________
+# a single filter stage that checks every row once:
+def filter_rows(data, match):
+	for row in data:
+		if match(row[0]):
+			yield row
+
+def compile_filter(words, mode='all', method='scan'):
+	# returns a filter stage: a generator function data -> matching rows.
+	if method != 'scan':
+		match = compile_matcher(words, mode, method)
+		return lambda data: filter_rows(data, match)
+
+	# for the plain scan we go one step further and write the whole stage, so the test is
+	# inlined in the loop and there is not even a function call per row:
+	#   def stage(data):
+	#       for row in data:
+	#           text = row[0]
+	#           if w0 in text and w1 in text and w2 in text:
+	#               yield row
+	_, names, test = scan_source(words, mode)
+	test = test or 'True'
+	source = (
+		'def stage(data):\n'
+		'\tfor row in data:\n'
+		'\t\ttext = row[0]\n'
+		f'\t\tif {test}:\n'
+		'\t\t\tyield row\n'
+	)
+	exec(compile(source, '<filter>', 'exec'), names)
+	return names['stage']
+
+def pipeline(fname, *filter_words, mode='all', method='scan'):
+	data = parse_data(fname)
+	if filter_words:
+		data = compile_filter(filter_words, mode, method)(data)
+	yield from data
+
+def chained_pipeline(fname, *filter_words): # 03.generic_pipeline.py
+	data = parse_data(fname)
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+print('\nFUSED PIPELINE: (Chevrolet, Monte, Landau)')
+for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau'):
+	print(row)
+# ['Chevrolet Monte Carlo Landau', '15.5', '8', '350.0', '170.0', '4165.', '11.4', '77', 'US']
+# ['Chevrolet Monte Carlo Landau', '19.2', '8', '305.0', '145.0', '3425.', '13.2', '78', 'US']
+
+# every method returns exactly the same rows as the chained filters:
+expected = list(chained_pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau'))
+for method in ('scan', 'regex', 'aho'):
+	print(method, list(pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', method=method)) == expected)
+# scan True
+# regex True
+# aho True
+
+print('\nANY OF: (Monte Carlo, Mustang)')
+for row in pipeline('cars.csv', 'Monte Carlo', 'Mustang', mode='any', method='aho'):
+	print(row[0])
+# Chevrolet Monte Carlo
+# Ford Mustang Boss 302
+# ...
+
+#_______________________________________________________________________________________
+# benchmark: how throughput scales as the keyword count grows from 1 to 1000.
+# we only want to time the filter stage, so the rows are parsed once and kept in memory.
+def keywords(rows, k):
+	# the k most common 3-letter pieces of the car names. common pieces are the worst
+	# case for the chain, because many rows survive the first filters.
+	counts = Counter(name[i:i + 3] for name in set(row[0] for row in rows)
+					 for i in range(len(name) - 2))
+	return [piece for piece, _ in counts.most_common(k)]
+
+def rows_per_sec(make_chain, rows, repeats=3):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		for _ in make_chain(iter(rows)):
+			pass
+		best = min(best, perf_counter() - start)
+	return len(rows) / best
+
+def chained(words):
+	def make_chain(data):
+		for word in words:
+			data = filter_data(data, word)
+		return data
+	return make_chain
+
+def any_chain(words): # the naive way to do `any`, one scan per word
+	return lambda data: (row for row in data if any(word in row[0] for word in words))
+
+if __name__ == '__main__':
+	rows = list(parse_data('cars.csv')) * 250 # ~100k rows
+	print(f'\nBENCHMARK (all of K words): {len(rows):,} rows, rows/sec')
+	print(f'{"K":>6}{"chain":>12}{"scan":>12}{"regex":>12}{"aho":>12}')
+	for k in (1, 10, 100, 1000):
+		words = keywords(rows, k)
+		try:
+			chain = f'{rows_per_sec(chained(words), rows):>12,.0f}'
+		except RecursionError: # 1000 nested generators are deeper than the recursion limit
+			chain = f'{"RecursionError":>15}'
+		speeds = [rows_per_sec(compile_filter(words, 'all', method), rows) for method in ('scan', 'regex', 'aho')]
+		print(f'{k:>6}{chain}' + ''.join(f'{speed:>12,.0f}' for speed in speeds))
+
+	print(f'\nBENCHMARK (any of K words): {len(rows):,} rows, rows/sec')
+	print(f'{"K":>6}{"any()":>12}{"scan":>12}{"regex":>12}{"aho":>12}')
+	for k in (1, 10, 100, 1000):
+		words = keywords(rows, 5000)[-k:] # rare pieces, so most rows need a full check
+		speeds = [rows_per_sec(any_chain(words), rows)]
+		speeds += [rows_per_sec(compile_filter(words, 'any', method), rows) for method in ('scan', 'regex', 'aho')]
+		print(f'{k:>6}' + ''.join(f'{speed:>12,.0f}' for speed in speeds))
+
+# BENCHMARK (all of K words): 101,750 rows, rows/sec
+#      K       chain        scan       regex         aho
+#      1  25,702,623  19,926,354   2,342,054     663,247
+#     10  18,695,318  20,709,424   2,624,452     505,520
+#    100  17,911,254  17,455,684   2,601,865     380,807
+#   1000 RecursionError  17,104,031   2,512,740     270,333
+
+# BENCHMARK (any of K words): 101,750 rows, rows/sec
+#      K       any()        scan       regex         aho
+#      1   2,561,610  17,762,758   6,841,089     851,877
+#     10   1,031,492   2,337,991   1,630,979     629,976
+#    100     153,940     259,389     188,389     294,590
+#   1000      62,691     103,302      38,331     286,890
+
+# with `all` most rows are rejected by the first word, so the chain is cheap and only the
+# compiled scan keeps up with it. but the chain simply cannot be built with 1000 words:
+# every next() goes 1000 generator frames deep and hits the recursion limit.
+# the fused stage is one frame deep for any K.
+# with `any` every row must be tested against every word until one matches, and that is
+# where the automaton wins: its cost depends on the length of the text, not on K.
@@ -0,0 +1,142 @@
+import csv
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import cpu_count
+from time import perf_counter
+
+# the pull pipeline (parse_data -> filter_data) runs on a single core. concepts/multiprocessing.py
+# shows that splitting the work across processes bypasses the GIL, so lets do the same with
+# the pipeline: cut the file into byte ranges, run the same filter chain on every range in a
+# separate process, and merge the results back.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+# the dialect returned by csv.Sniffer is a class created on the fly, it cant be pickled and
+# sent to another process. so we send its attributes instead and rebuild it in the worker.
+DIALECT_ATTRS = ('delimiter', 'quotechar', 'escapechar', 'doublequote',
+				 'skipinitialspace', 'quoting', 'lineterminator')
+
+def sniff(fname):
+	with open(fname, newline='') as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+	return {attr: getattr(dialect, attr) for attr in DIALECT_ATTRS}
+
+def shards(fname, n):
+	# splits the file (without the header) into ~n byte ranges [begin, end).
+	# every boundary is moved forward to the start of the next line, so no line is cut.
+	# note: it assumes that quoted fields dont contain newlines, like cars.csv.
+	size = os.path.getsize(fname)
+	with open(fname, 'rb') as f:
+		f.readline() # skiping header
+		start = f.tell()
+		boundaries = [start]
+		for i in range(1, n):
+			f.seek(max(start + (size - start) * i // n - 1, boundaries[-1]))
+			f.readline() # moving to the start of the next line
+			boundaries.append(min(f.tell(), size))
+	boundaries.append(size)
+	return [(begin, end) for begin, end in zip(boundaries, boundaries[1:]) if begin < end]
+
+def run_shard(fname, begin, end, dialect, filter_words):
+	# runs inside the worker process, with the very same filter chain.
+	with open(fname, 'rb') as f:
+		f.seek(begin)
+		text = f.read(end - begin).decode()
+	data = csv.reader(io.StringIO(text, newline=''), **dialect)
+	for word in filter_words:
+		data = filter_data(data, word)
+	return list(data)
+
+#_______________________________________________________________________________________
+def pipeline(fname, *filter_words, workers=None, ordered=True, shard_bytes=4 * 1024 * 1024):
+	# workers=None keeps the old single process behavior.
+	# ordered=True yields rows in file order, ordered=False yields each shard as soon as
+	# it is done, which keeps every worker busy when the shards are uneven.
+	if not workers or workers == 1:
+		data = parse_data(fname)
+		for word in filter_words:
+			data = filter_data(data, word)
+		yield from data
+		return
+
+	dialect = sniff(fname)
+	# at least a few shards per worker, so a slow shard doesnt leave the others idle.
+	n_shards = max(workers * 4, os.path.getsize(fname) // shard_bytes)
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [pool.submit(run_shard, fname, begin, end, dialect, filter_words)
+				   for begin, end in shards(fname, n_shards)]
+		try:
+			for future in (futures if ordered else as_completed(futures)):
+				yield from future.result()
+		finally:
+			# the consumer stopped early (break, islice) or a shard failed: the shards not
+			# started yet are dropped, only the running ones are waited for.
+			pool.shutdown(cancel_futures=True)
+
+#_______________________________________________________________________________________
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+# the process pool may start new interpreters that import this module again, so everything
+# that runs something must stay behind the __main__ check (like concepts/multiprocessing.py).
+if __name__ == '__main__':
+	print('\nSHARDED PIPELINE: (Chevrolet, Monte, Landau)')
+	for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', workers=2):
+		print(row)
+	# ['Chevrolet Monte Carlo Landau', '15.5', '8', '350.0', '170.0', '4165.', '11.4', '77', 'US']
+	# ['Chevrolet Monte Carlo Landau', '19.2', '8', '305.0', '145.0', '3425.', '13.2', '78', 'US']
+
+	serial = list(pipeline('cars.csv', 'Chevrolet'))
+	print(list(pipeline('cars.csv', 'Chevrolet', workers=4)) == serial)                  # True
+	print(sorted(pipeline('cars.csv', 'Chevrolet', workers=4, ordered=False)) == sorted(serial)) # True
+
+	big, n_rows = make_big_file('cars.csv', 2000)
+	words = ('Chevrolet', 'Malibu')
+	try:
+		print(f'\nBENCHMARK: {n_rows:,} rows, filters {words}, {cpu_count()} cpu(s)')
+		runs = [(None, True)] + [(workers, ordered) for workers in sorted({2, 4, cpu_count()} - {1})
+								 for ordered in (True, False)]
+		for workers, ordered in runs:
+			start = perf_counter()
+			for _ in pipeline(big, *words, workers=workers, ordered=ordered):
+				pass
+			elapsed = perf_counter() - start
+			print(f'workers={workers!s:<5} ordered={ordered!s:<6} '
+				  f'{elapsed:6.2f} sec  {n_rows / elapsed:>12,.0f} rows/sec')
+	finally:
+		os.remove(big)
+
+# BENCHMARK: 814,000 rows, filters ('Chevrolet', 'Malibu'), 1 cpu(s)
+# workers=None  ordered=True     1.12 sec       729,106 rows/sec
+# workers=2     ordered=True     1.26 sec       646,276 rows/sec
+# workers=2     ordered=False    1.27 sec       640,187 rows/sec
+# workers=4     ordered=True     1.30 sec       625,085 rows/sec
+# workers=4     ordered=False    1.34 sec       606,994 rows/sec
+
+# this run was on a single cpu machine, so the workers just take turns and we only see the
+# cost of the pool: starting processes and pickling the surviving rows back to the parent.
+# that cost is small (~15%), so with N real cores the parsing, which is most of the work,
+# gets split N ways like the counter in concepts/multiprocessing.py.
+# the filters should be selective: every row that survives has to be pickled, and with
+# filters that keep most of the rows the pickling alone costs more than the parsing.
@@ -0,0 +1,156 @@
+import csv
+import io
+import mmap
+import os
+import re
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+# parse_data opens the file in text mode: every byte is read() into a buffer, decoded into
+# a str, and every line is split into a list of str, even the lines that the very first
+# filter throws away.
+
+# with mmap the file is mapped into our memory and the OS loads its pages on demand. the
+# mmap object can be searched in place (mm.find and the re module accept it without copying
+# anything), so we can test the filter words on the bytes of the first field and only
+# decode and split the lines that survive.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+def line_pattern(words, delimiter):
+	# a bytes regex that matches a whole line whose first field contains every word:
+	#   ^(?=[^;\n]*Chevrolet)(?=[^;\n]*Monte)[^\n]+
+	# the regex engine runs over the mapped bytes in C, so the lines that dont match are
+	# never copied out of the map, decoded or split.
+	field = b'[^' + re.escape(delimiter) + b'\\n]*'
+	lookaheads = b''.join(b'(?=' + field + re.escape(word) + b')' for word in words)
+	return re.compile(b'^' + lookaheads + b'[^\\n]+', re.M)
+
+def parse_mmap(fname, *filter_words, encoding='utf-8'):
+	# yields the parsed rows whose first field contains every filter word.
+	with open(fname, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		# sniffing from the mapped buffer, the slice only copies these 2000 bytes
+		dialect = csv.Sniffer().sniff(mm[:2000].decode(encoding, errors='ignore'))
+		delimiter = dialect.delimiter.encode(encoding)
+		quotechar = (dialect.quotechar or '"').encode(encoding)
+		words = [word.encode(encoding) for word in filter_words]
+		start = mm.find(b'\n') + 1 # skiping header
+		if not start:
+			return
+
+		if mm.find(quotechar, start) == -1:
+			# no quoted fields in the whole file: a line is just bytes split on the delimiter
+			for match in line_pattern(words, delimiter).finditer(mm, start):
+				yield match[0].rstrip(b'\r').decode(encoding).split(dialect.delimiter)
+			return
+
+		# quoted fields may hide delimiters and line breaks, so csv parses each record, but
+		# we still test the words on the raw bytes first when the first field isnt quoted.
+		# a record goes on over a line break while one of its quotes is still open, that is
+		# while it has an odd number of quote chars (an escaped "" counts twice).
+		find, size, pos = mm.find, len(mm), start
+		while pos < size:
+			eol = find(b'\n', pos)
+			if eol == -1: # last line without a line break
+				eol = size
+			first_eol = eol
+			if find(quotechar, pos, eol) != -1:
+				quotes = mm[pos:eol].count(quotechar)
+				while quotes % 2 and eol < size: # the record goes on on the next line
+					next_eol = find(b'\n', eol + 1)
+					if next_eol == -1:
+						next_eol = size
+					quotes += mm[eol:next_eol].count(quotechar)
+					eol = next_eol
+			if eol > pos: # skiping empty lines
+				end = find(delimiter, pos, first_eol) # end of the first field
+				if end == -1:
+					end = first_eol
+				if find(quotechar, pos, end) != -1 or all(find(word, pos, end) != -1 for word in words):
+					row = next(csv.reader(io.StringIO(mm[pos:eol].decode(encoding), newline=''), dialect))
+					if all(word in row[0] for word in filter_words):
+						yield row
+			pos = eol + 1
+
+def pipeline(fname, *filter_words, use_mmap=False):
+	if use_mmap: # the filter words are tested inside the reader
+		yield from parse_mmap(fname, *filter_words)
+		return
+	data = parse_data(fname)
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+print('\nMMAP PIPELINE: (Chevrolet, Monte, Landau)')
+for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', use_mmap=True):
+	print(row)
+# ['Chevrolet Monte Carlo Landau', '15.5', '8', '350.0', '170.0', '4165.', '11.4', '77', 'US']
+# ['Chevrolet Monte Carlo Landau', '19.2', '8', '305.0', '145.0', '3425.', '13.2', '78', 'US']
+
+print(list(pipeline('cars.csv', 'Chevrolet', use_mmap=True)) == list(pipeline('cars.csv', 'Chevrolet'))) # True
+print(list(pipeline('cars.csv', use_mmap=True)) == list(pipeline('cars.csv')))                           # True
+
+#_______________________________________________________________________________________
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+def measure(fname, *filter_words, **options):
+	start = perf_counter()
+	for _ in pipeline(fname, *filter_words, **options):
+		pass
+	elapsed = perf_counter() - start
+
+	# second run just for the memory: tracemalloc slows everything down.
+	tracemalloc.start()
+	for _ in pipeline(fname, *filter_words, **options):
+		pass
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return elapsed, peak
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 1000)
+	try:
+		for words in (('Chevrolet', 'Monte', 'Landau'), ('o',)):
+			print(f'\nBENCHMARK: {n_rows:,} rows, filters {words}')
+			for use_mmap in (False, True):
+				elapsed, peak = measure(big, *words, use_mmap=use_mmap)
+				print(f'use_mmap={use_mmap!s:<6} {n_rows / elapsed:>12,.0f} rows/sec'
+					  f'   peak python memory {peak / 1024:>8,.1f} KiB')
+	finally:
+		os.remove(big)
+
+# BENCHMARK: 407,000 rows, filters ('Chevrolet', 'Monte', 'Landau')
+# use_mmap=False       739,443 rows/sec   peak python memory     58.7 KiB
+# use_mmap=True      1,438,175 rows/sec   peak python memory     41.8 KiB
+
+# BENCHMARK: 407,000 rows, filters ('o',)
+# use_mmap=False     1,001,760 rows/sec   peak python memory     58.2 KiB
+# use_mmap=True        688,038 rows/sec   peak python memory     41.7 KiB
+
+# with selective filters the mapped version is ~2x faster: the rejected lines are never
+# decoded nor split, the regex just walks over their bytes.
+# when most lines survive we pay for the regex AND for decoding every line, so the plain
+# csv.reader wins. the python heap is tiny in both cases because both are streaming, the
+# difference is in what the OS does: the mapped pages live in the page cache and can be
+# dropped at any time, and there are no read() calls copying the file into our buffers.
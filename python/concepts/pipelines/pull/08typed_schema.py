@@ -0,0 +1,158 @@
+import csv
+import tracemalloc
+from collections import namedtuple
+from time import perf_counter
+
+# cars.csv has a second header row with the type of each column:
+#   Car;MPG;Cylinders;Displacement;Horsepower;Weight;Acceleration;Model;Origin
+#   STRING;DOUBLE;INT;DOUBLE;DOUBLE;DOUBLE;DOUBLE;INT;CAT
+# parse_data doesnt know about it, so it yields that row as if it was a car, and every
+# value comes out as a str that each consumer has to convert again and again.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+# categorical columns (CAT) have only a few distinct values ('US', 'Europe', 'Japan').
+# instead of keeping one str per row, we keep each value once and store a small int code.
+class Category:
+	def __init__(self):
+		self.codes = {}  # value -> code
+		self.values = [] # code -> value
+
+	def __call__(self, value): # used as a converter: 'US' -> 0
+		code = self.codes.get(value)
+		if code is None:
+			code = self.codes[value] = len(self.values)
+			self.values.append(value)
+		return code
+
+	def decode(self, code): # 0 -> 'US'
+		return self.values[code]
+
+	def __repr__(self):
+		return f'Category({self.values})'
+
+TYPES = {
+	'STRING': str,
+	'DOUBLE': float,
+	'INT': int,
+	'CAT': Category, # a new encoder for every column
+}
+
+def is_type_row(row):
+	return bool(row) and all(cell in TYPES for cell in row)
+
+class Schema:
+	def __init__(self, header, types):
+		self.header = header
+		self.types = types
+		self.converters = [TYPES[name]() if name == 'CAT' else TYPES[name] for name in types]
+		self.categories = {column: converter for column, converter in zip(header, self.converters)
+						   if isinstance(converter, Category)}
+		# namedtuples have no instance __dict__, just the values (see 05slots.py)
+		self.Record = namedtuple('Record', header, rename=True)
+
+	def convert(self, row):
+		return self.Record._make([converter(cell) for converter, cell in zip(self.converters, row)])
+
+	def __repr__(self):
+		return f'Schema({dict(zip(self.header, self.types))})'
+
+#_______________________________________________________________________________________
+def read_typed(fname):
+	# returns (schema, records). if the file has no type row we cant guess the types, so
+	# schema is None and the rows come out exactly like parse_data.
+	# the header and the type row are read here, and the file is closed right away: records
+	# opens it again when they are consumed, so nothing is left open if they never are.
+	with open(fname) as f:
+		sample = f.read(2000)
+		if not sample.strip():
+			raise ValueError(f'{fname}: empty file, there is no header')
+		dialect = csv.Sniffer().sniff(sample)
+		f.seek(0)
+		reader = csv.reader(f, dialect=dialect)
+		header = next(reader)
+		first = next(reader, None)
+	schema = Schema(header, first) if first is not None and is_type_row(first) else None
+
+	def generate():
+		with open(fname) as f:
+			reader = csv.reader(f, dialect=dialect)
+			next(reader) # skiping header
+			if schema is None:
+				yield from reader
+			else:
+				next(reader) # skiping the type row
+				yield from map(schema.convert, reader)
+	return schema, generate()
+
+def parse_typed(fname):
+	_, records = read_typed(fname)
+	yield from records
+
+def pipeline(fname, *filter_words):
+	data = parse_typed(fname) # records are tuples, so row[0] still works in filter_data
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+schema, records = read_typed('cars.csv')
+print(schema)
+# Schema({'Car': 'STRING', 'MPG': 'DOUBLE', 'Cylinders': 'INT', ..., 'Origin': 'CAT'})
+print(next(records))
+# Record(Car='Chevrolet Chevelle Malibu', MPG=18.0, Cylinders=8, Displacement=307.0,
+#        Horsepower=130.0, Weight=3504.0, Acceleration=12.0, Model=70, Origin=0)
+records.close()
+
+print('\nTYPED RECORDS: (Landau)')
+schema, records = read_typed('cars.csv')
+for car in filter_data(records, 'Landau'):
+	print(car.Car, car.MPG, schema.categories['Origin'].decode(car.Origin))
+# Chevrolet Monte Carlo Landau 15.5 US
+# Chevrolet Monte Carlo Landau 19.2 US
+# Ford LTD Landau 17.6 US
+
+print(schema.categories) # {'Origin': Category(['US', 'Europe', 'Japan'])}
+
+#_______________________________________________________________________________________
+# benchmark: memory held by the parsed file, and parsing speed.
+def measure(make_rows, repeats=5):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		rows = list(make_rows())
+		best = min(best, perf_counter() - start)
+	del rows
+	tracemalloc.start()
+	rows = list(make_rows())
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return len(rows), best, size
+
+if __name__ == '__main__':
+	print('\nBENCHMARK: cars.csv fully loaded in memory')
+	for name, make_rows in (('str rows', lambda: parse_data('cars.csv')),
+							('typed records', lambda: parse_typed('cars.csv'))):
+		n_rows, elapsed, size = measure(make_rows)
+		print(f'{name:<14} {n_rows} rows  {elapsed * 1000:6.2f} ms  '
+			  f'{size / 1024:7.1f} KiB  ({size / n_rows:.0f} bytes/row)')
+
+# BENCHMARK: cars.csv fully loaded in memory
+# str rows       407 rows    1.07 ms    248.4 KiB  (625 bytes/row)
+# typed records  406 rows    3.62 ms    131.4 KiB  (331 bytes/row)
+
+# the typed records take about half the memory: a namedtuple instead of a list, one float
+# instead of a str like '3504.', and the Origin column is a small int (cached by python)
+# pointing to one shared 'US' str. note the type row is gone too (406 rows instead of 407).
+# parsing is slower because we convert every cell up front, but we do it exactly once,
+# the consumers get MPG as a float and never parse it again.
@@ -0,0 +1,156 @@
+import csv
+import os
+import tempfile
+from time import perf_counter
+
+# when a pipeline(...) chain is slow, which stage is the problem? the parsing? one of the
+# filters? the generators dont tell us anything, so lets measure them.
+
+# same approach as the Profiler class of polymorphism/06.callables.py: a callable object
+# that keeps counters and uses perf_counter around the calls. here the "call" is next()
+# on a stage generator. since pulling is nested (next() on a filter calls next() on the
+# stage before it), the time of a stage includes the time of everything upstream, so:
+#   own time = time inside next() of this stage - time inside next() of the upstream stage
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+class StageProfiler:
+	def __init__(self, name, upstream=None):
+		self.name = name
+		self.upstream = upstream # profiler of the stage before this one
+		self.counter = 0         # items that came out of this stage
+		self.total_elapsed = 0   # time inside next(), upstream included
+
+	def __call__(self, gen):
+		# wraps the stage generator, timing every next() call
+		it = iter(gen)
+		while True:
+			start = perf_counter()
+			try:
+				item = next(it)
+			except StopIteration:
+				self.total_elapsed += perf_counter() - start
+				return
+			self.total_elapsed += perf_counter() - start
+			self.counter += 1
+			yield item
+
+	@property
+	def items_in(self):
+		return self.upstream.counter if self.upstream else None
+
+	@property
+	def waiting(self): # time spent waiting for the upstream stages
+		return self.upstream.total_elapsed if self.upstream else 0
+
+	@property
+	def own_time(self):
+		return self.total_elapsed - self.waiting
+
+	@property
+	def selectivity(self): # fraction of the rows that passed
+		return self.counter / self.items_in if self.items_in else None
+
+def report(profilers):
+	total = profilers[-1].total_elapsed or 1
+	print(f'\n{"stage":<20}{"in":>9}{"out":>9}{"passed":>9}{"own ms":>10}{"wait ms":>10}{"own %":>7}')
+	for p in profilers:
+		items_in = '-' if p.items_in is None else p.items_in
+		passed = '-' if p.selectivity is None else f'{p.selectivity:.1%}'
+		print(f'{p.name:<20}{items_in:>9}{p.counter:>9}{passed:>9}'
+			  f'{p.own_time * 1000:>10.2f}{p.waiting * 1000:>10.2f}{p.own_time / total:>7.0%}')
+
+#_______________________________________________________________________________________
+def pipeline(fname, *filter_words, profile=False):
+	# profile=True prints the report at the end, profile=some_function calls it with the
+	# list of profilers instead.
+	if not profile: # exactly the old chain, nothing to pay for
+		data = parse_data(fname)
+		for word in filter_words:
+			data = filter_data(data, word)
+		yield from data
+		return
+
+	profiler = StageProfiler('parse_data')
+	profilers = [profiler]
+	data = profiler(parse_data(fname))
+	for word in filter_words:
+		profiler = StageProfiler(f'filter {word!r}', upstream=profiler)
+		profilers.append(profiler)
+		data = profiler(filter_data(data, word))
+	try:
+		yield from data
+	finally: # when the pipeline is exhausted, or closed before that
+		(report if profile is True else profile)(profilers)
+
+print('\nPROFILED PIPELINE: (Chevrolet, Monte, Landau)')
+for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', profile=True):
+	print(row)
+# ['Chevrolet Monte Carlo Landau', '15.5', '8', '350.0', '170.0', '4165.', '11.4', '77', 'US']
+# ['Chevrolet Monte Carlo Landau', '19.2', '8', '305.0', '145.0', '3425.', '13.2', '78', 'US']
+#
+# stage                      in      out   passed    own ms   wait ms  own %
+# parse_data                  -      407        -      3.13      0.00    92%
+# filter 'Chevrolet'        407       46    11.3%      0.23      3.13     7%
+# filter 'Monte'             46        4     8.7%      0.03      3.37     1%
+# filter 'Landau'             4        2    50.0%      0.01      3.40     0%
+
+#_______________________________________________________________________________________
+# benchmark: what does the profiler cost? with profile=False it is the same generator
+# chain as before, so it costs nothing.
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 500)
+	words = ('o', 'Chevrolet', 'Monte', 'Landau')
+	try:
+		print(f'\nBENCHMARK: {n_rows:,} rows, filters {words}')
+		runs = []
+		for profile in (False, runs.append):
+			best = float('inf')
+			for _ in range(3):
+				start = perf_counter()
+				for _ in pipeline(big, *words, profile=profile):
+					pass
+				best = min(best, perf_counter() - start)
+			print(f'profile={bool(profile)!s:<6} {n_rows / best:>12,.0f} rows/sec')
+		report(runs[-1])
+	finally:
+		os.remove(big)
+
+# BENCHMARK: 203,500 rows, filters ('o', 'Chevrolet', 'Monte', 'Landau')
+# profile=False       843,667 rows/sec
+# profile=True        414,110 rows/sec
+#
+# stage                      in      out   passed    own ms   wait ms  own %
+# parse_data                  -   203500        -    279.12      0.00    57%
+# filter 'o'             203500   152500    74.9%    111.81    279.12    23%
+# filter 'Chevrolet'     152500    23000    15.1%     85.94    390.93    18%
+# filter 'Monte'          23000     2000     8.7%     12.71    476.87     3%
+# filter 'Landau'          2000     1000    50.0%      1.17    489.58     0%
+
+# turned on, the profiler doubles the cost of each hop (one more generator and two
+# perf_counter calls per item per stage), which is fine to find the bottleneck but not
+# to leave it on. turned off it is not there at all.
+# the report already tells us something: 'o' lets 75% of the rows through and costs more
+# than 'Chevrolet' which is much more selective, they should run the other way around.
@@ -0,0 +1,129 @@
+import csv
+import itertools
+import os
+import tempfile
+from time import perf_counter
+
+# the profiler (10stage_profiler.py) showed that the order of the filters matters: every
+# row goes through the first filter, but only the survivors reach the next ones. so the
+# first filters should be the ones that throw away the most rows for the least work.
+
+# all the filters must pass (it is an AND), so any order gives the same rows. the adaptive
+# mode looks at the first rows, measures each filter on them, and picks the order.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+def measure(sample, word):
+	# returns (pass rate, seconds per row) of one filter over the sample
+	start = perf_counter()
+	passed = sum(1 for row in sample if word in row[0])
+	elapsed = perf_counter() - start
+	return passed / len(sample), elapsed / len(sample)
+
+def best_order(sample, filter_words):
+	# the classic rule to order AND filters: sort by  cost / (1 - pass rate)
+	# that is, the cost we pay for every row the filter throws away. a cheap filter that
+	# drops most rows goes first, an expensive one that keeps almost all of them goes last.
+	if not sample:
+		return list(filter_words)
+	stats = {word: measure(sample, word) for word in dict.fromkeys(filter_words)}
+
+	def rank(word):
+		pass_rate, cost = stats[word]
+		if pass_rate >= 1: # drops nothing, at least not on the sample
+			return float('inf')
+		return cost / (1 - pass_rate)
+
+	return sorted(stats, key=rank)
+
+def pipeline(fname, *filter_words, adaptive=False, sample_size=5000):
+	data = parse_data(fname)
+	if adaptive and len(filter_words) > 1:
+		sample = list(itertools.islice(data, sample_size))
+		filter_words = best_order(sample, filter_words)
+		# the sample rows were already read, so they go first, then the rest of the file
+		data = itertools.chain(sample, data)
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+print('\nORDER FOUND FOR: (o, Chevrolet, Monte, Landau)')
+sample = list(itertools.islice(parse_data('cars.csv'), 5000))
+print(best_order(sample, ('o', 'Chevrolet', 'Monte', 'Landau')))
+# ['Landau', 'Monte', 'Chevrolet', 'o']
+
+# same result set in any order:
+fixed = list(pipeline('cars.csv', 'o', 'Chevrolet', 'Monte', 'Landau'))
+adaptive = list(pipeline('cars.csv', 'o', 'Chevrolet', 'Monte', 'Landau', adaptive=True))
+print(fixed == adaptive) # True
+
+#_______________________________________________________________________________________
+# benchmark: the caller gives the worst order (the least selective filter first).
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+def rows_per_sec(fname, n_rows, *filter_words, repeats=3, **options):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		for _ in pipeline(fname, *filter_words, **options):
+			pass
+		best = min(best, perf_counter() - start)
+	return n_rows / best
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 500)
+	try:
+		for words in (('o', 'e', 'r', 'Chevrolet', 'Monte', 'Landau'), ('Ford', 'Pinto')):
+			print(f'\nBENCHMARK: {n_rows:,} rows, filters {words}')
+			print(f'given order    {rows_per_sec(big, n_rows, *words):>12,.0f} rows/sec')
+			print(f'adaptive order {rows_per_sec(big, n_rows, *words, adaptive=True):>12,.0f} rows/sec')
+			print('filter work only, rows already parsed in memory:')
+			rows = list(parse_data(big))
+			for label, order in (('given', words), ('adaptive', best_order(rows[:5000], words))):
+				start = perf_counter()
+				data = iter(rows)
+				for word in order:
+					data = filter_data(data, word)
+				for _ in data:
+					pass
+				print(f'  {label:<12} {n_rows / (perf_counter() - start):>12,.0f} rows/sec  {order}')
+	finally:
+		os.remove(big)
+
+# BENCHMARK: 203,500 rows, filters ('o', 'e', 'r', 'Chevrolet', 'Monte', 'Landau')
+# given order       1,213,851 rows/sec
+# adaptive order    1,351,605 rows/sec
+# filter work only, rows already parsed in memory:
+#   given           6,838,466 rows/sec  ('o', 'e', 'r', 'Chevrolet', 'Monte', 'Landau')
+#   adaptive       14,243,369 rows/sec  ['Landau', 'Monte', 'Chevrolet', 'e', 'r', 'o']
+
+# BENCHMARK: 203,500 rows, filters ('Ford', 'Pinto')
+# given order       1,535,045 rows/sec
+# adaptive order    1,459,340 rows/sec
+# filter work only, rows already parsed in memory:
+#   given          11,752,151 rows/sec  ('Ford', 'Pinto')
+#   adaptive       11,899,414 rows/sec  ['Pinto', 'Ford']
+
+# the filters themselves run 2x faster in the good order, but in the whole pipeline the
+# parsing is most of the time, so the end to end gain is ~10%. when the given order is
+# already fine (Ford, Pinto) sampling costs a little and gains nothing.
@@ -0,0 +1,290 @@
+import csv
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections import namedtuple
+from time import perf_counter
+
+# every run of parse_data('cars.csv') sniffs the dialect and parses the whole text file
+# again, even when the file didnt change since the last run.
+
+# the cache: the first run parses the file into typed columns (using the type row, like
+# 08typed_schema.py) and writes them to a binary side file, 'cars.csv.colcache'. the next
+# runs just memory-map that file. numeric columns are used straight from the mapped bytes
+# through memoryview.cast(), nothing is parsed nor copied.
+# the cache remembers the path, mtime and size of the csv. if any of them changed, the
+# cache is stale and gets rebuilt.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+# cache file layout:
+#   b'COLCACHE' | header length (8 bytes) | json header | column data, 8 bytes aligned
+# the json header describes where each column starts and how to read it:
+#   DOUBLE -> array('d'), INT -> array('q'), CAT -> array('i') of codes + the values in json
+#   STRING -> array('q') of n+1 offsets + all the strings utf-8 encoded one after the other
+MAGIC = b'COLCACHE'
+TYPECODES = {'DOUBLE': 'd', 'INT': 'q', 'CAT': 'i'}
+CONVERTERS = {'DOUBLE': float, 'INT': int}
+
+def cache_path(fname):
+	return fname + '.colcache'
+
+def source_key(fname, stat=None):
+	stat = stat or os.stat(fname)
+	return {'path': os.path.abspath(fname), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def read_columns(fname):
+	# the slow path: parsing the csv into typed columns. the key of the csv is taken from
+	# the open file before reading it, so it describes the data we read, or older data.
+	with open(fname) as f:
+		key = source_key(fname, os.fstat(f.fileno()))
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		reader = csv.reader(f, dialect=dialect)
+		header = next(reader)
+		first = next(reader, None)
+		rows = [] if first is None else [first]
+		types = ['STRING'] * len(header) # without a type row everything stays a str
+		if first is not None and all(cell in ('STRING', 'DOUBLE', 'INT', 'CAT') for cell in first):
+			types, rows = first, []
+		rows.extend(row for row in reader if row) # a blank line is not a row
+	for number, row in enumerate(rows, 1):
+		if len(row) != len(header):
+			raise ValueError(f'{fname}: row {number} has {len(row)} fields, the header has {len(header)}')
+	# column by column, by index: zip(*rows) would cut every column to the shortest row
+	columns = [[row[i] for row in rows] for i in range(len(header))]
+	return header, types, columns, len(rows), key
+
+def encode_column(kind, cells):
+	# returns (bytes chunks, extra info for the json header)
+	if kind in CONVERTERS:
+		return [array(TYPECODES[kind], map(CONVERTERS[kind], cells)).tobytes()], {}
+	if kind == 'CAT':
+		values = list(dict.fromkeys(cells)) # each distinct value once, in order of appearance
+		codes = {value: code for code, value in enumerate(values)}
+		return [array('i', [codes[cell] for cell in cells]).tobytes()], {'values': values}
+	blob = [cell.encode() for cell in cells]
+	offsets = array('q', [0])
+	for data in blob:
+		offsets.append(offsets[-1] + len(data))
+	return [offsets.tobytes(), b''.join(blob)], {'offsets_nbytes': len(offsets) * 8}
+
+def write_cache(fname):
+	# returns False without writing anything if the csv changed while we parsed it
+	header, types, columns, n_rows, key = read_columns(fname)
+	if source_key(fname) != key:
+		return False
+	layout, chunks, position = [], [], 0
+	for name, kind, cells in zip(header, types, columns):
+		data, extra = encode_column(kind, cells)
+		nbytes = sum(map(len, data))
+		layout.append({'name': name, 'kind': kind, 'offset': position, 'nbytes': nbytes, **extra})
+		padding = -nbytes % 8 # keeping every column 8 bytes aligned, for memoryview.cast()
+		chunks.extend(data + [b'\0' * padding])
+		position += nbytes + padding
+	meta = json.dumps({'source': key, 'n_rows': n_rows, 'columns': layout}).encode()
+	meta += b' ' * (-len(meta) % 8)
+
+	tmp = cache_path(fname) + '.tmp' # writing aside and renaming, so a crash never leaves half a cache
+	with open(tmp, 'wb') as f:
+		f.write(MAGIC + struct.pack('<Q', len(meta)) + meta)
+		f.writelines(chunks)
+	os.replace(tmp, cache_path(fname))
+	return True
+
+#_______________________________________________________________________________________
+class StringColumn:
+	# a column of str, decoded only when someone reads a value
+	def __init__(self, offsets, blob):
+		self.offsets = offsets
+		self.blob = blob
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def __getitem__(self, i):
+		return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+	def __iter__(self):
+		blob, offsets = self.blob, self.offsets
+		for start, end in zip(offsets, offsets[1:]):
+			yield str(blob[start:end], 'utf-8')
+
+class ColumnTable:
+	def __init__(self, mm, meta, data_start):
+		self.mm = mm # the views below point into the map, so it must stay alive
+		self.n_rows = meta['n_rows']
+		self.header = [column['name'] for column in meta['columns']]
+		self.columns = {}
+		self.categories = {}
+		view = memoryview(mm)
+		for column in meta['columns']:
+			start = data_start + column['offset']
+			data = view[start:start + column['nbytes']]
+			kind = column['kind']
+			if kind == 'STRING':
+				split = column['offsets_nbytes']
+				self.columns[column['name']] = StringColumn(data[:split].cast('q'), data[split:])
+			else:
+				self.columns[column['name']] = data.cast(TYPECODES[kind])
+				if kind == 'CAT':
+					self.categories[column['name']] = column['values']
+		self.Record = namedtuple('Record', self.header, rename=True)
+
+	def __len__(self):
+		return self.n_rows
+
+	def __getitem__(self, name): # table['MPG'] -> the whole column
+		return self.columns[name]
+
+	def rows(self): # records, like 08typed_schema.py (CAT columns as codes)
+		return map(self.Record._make, zip(*self.columns.values()))
+
+def check_layout(meta, data_size):
+	# the sizes in the header must match the rows and fit in the file, or we would read garbage
+	n_rows = meta['n_rows']
+	for column in meta['columns']:
+		kind, nbytes = column['kind'], column['nbytes']
+		if kind == 'STRING':
+			if column['offsets_nbytes'] != (n_rows + 1) * 8 or nbytes < column['offsets_nbytes']:
+				return False
+		elif nbytes != n_rows * struct.calcsize(TYPECODES[kind]):
+			return False
+		if column['offset'] % 8 or column['offset'] + nbytes > data_size:
+			return False
+	return True
+
+def load_cache(fname):
+	# returns the ColumnTable, or None if there is no cache, or it is stale, or unreadable:
+	# callers never see a broken cache, it just gets rebuilt
+	try:
+		f = open(cache_path(fname), 'rb')
+	except FileNotFoundError:
+		return None
+	with f:
+		if os.fstat(f.fileno()).st_size < len(MAGIC) + 8:
+			return None
+		mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	try:
+		if mm[:len(MAGIC)] != MAGIC:
+			raise ValueError('not a column cache')
+		(meta_len,) = struct.unpack_from('<Q', mm, len(MAGIC))
+		data_start = len(MAGIC) + 8 + meta_len
+		if data_start > len(mm):
+			raise ValueError('truncated header')
+		meta = json.loads(mm[len(MAGIC) + 8:data_start])
+		if meta['source'] != source_key(fname) or not check_layout(meta, len(mm) - data_start):
+			raise ValueError('stale or inconsistent cache')
+		return ColumnTable(mm, meta, data_start)
+	except (ValueError, KeyError, TypeError, struct.error): # JSONDecodeError is a ValueError
+		try:
+			mm.close()
+		except BufferError: # a view into it is still alive, the gc will close it
+			pass
+		return None
+
+def load_columns(fname, attempts=3):
+	table = load_cache(fname)
+	for _ in range(attempts):
+		if table is not None:
+			return table
+		# cold start: parse once, and write the cache for next time. if the csv changes
+		# while we parse, nothing is written. if it changes right after, the cache has the
+		# key from before the parse and is already stale. either way we try again.
+		write_cache(fname)
+		table = load_cache(fname)
+	raise RuntimeError(f'{fname} keeps changing, could not build its column cache')
+
+def pipeline(fname, *filter_words):
+	data = load_columns(fname).rows()
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+#_______________________________________________________________________________________
+print('\nCACHED PIPELINE: (Chevrolet, Monte, Landau)')
+for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau'):
+	print(row)
+# Record(Car='Chevrolet Monte Carlo Landau', MPG=15.5, Cylinders=8, ..., Model=77, Origin=0)
+# Record(Car='Chevrolet Monte Carlo Landau', MPG=19.2, Cylinders=8, ..., Model=78, Origin=0)
+
+table = load_columns('cars.csv')
+print(len(table), table['MPG'][:3].tolist(), table['Car'][0]) # 406 [18.0, 15.0, 18.0] Chevrolet Chevelle Malibu
+print(table.categories) # {'Origin': ['US', 'Europe', 'Japan']}
+
+#_______________________________________________________________________________________
+# benchmark: cold start (no cache), warm start (cache is there), and the plain parse_data.
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		types = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		f.write(types)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+def timed(fn):
+	start = perf_counter()
+	result = fn()
+	return result, perf_counter() - start
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 1000)
+	table = None
+	try:
+		print(f'\nBENCHMARK: {n_rows:,} rows, average MPG')
+		rows, elapsed = timed(lambda: list(parse_data(big))[1:])
+		mpg = sum(float(row[1]) for row in rows) / len(rows)
+		print(f'parse_data          {elapsed * 1000:8.1f} ms   MPG {mpg:.2f}')
+
+		table, elapsed = timed(lambda: load_columns(big)) # no cache yet
+		print(f'cold (parse+write)  {elapsed * 1000:8.1f} ms   cache {os.path.getsize(cache_path(big)) / 1024:,.0f} KiB'
+			  f' (csv {os.path.getsize(big) / 1024:,.0f} KiB)')
+		del table
+
+		table, elapsed = timed(lambda: load_columns(big))
+		mpg, column = timed(lambda: sum(table['MPG']) / len(table))
+		print(f'warm (mmap)         {elapsed * 1000:8.1f} ms   MPG {mpg:.2f} in {column * 1000:.1f} ms')
+
+		_, elapsed = timed(lambda: sum(1 for _ in filter_data(table.rows(), 'Chevrolet')))
+		print(f'warm, all records   {elapsed * 1000:8.1f} ms')
+
+		os.utime(big) # touching the csv: the cache is now stale
+		print('stale cache found? ', load_cache(big) is None) # True
+	finally:
+		del table
+		os.remove(big)
+		if os.path.exists(cache_path(big)):
+			os.remove(cache_path(big))
+
+# BENCHMARK: 406,000 rows, average MPG
+# parse_data            1375.1 ms   MPG 23.05
+# cold (parse+write)    4441.7 ms   cache 33,438 KiB (csv 21,608 KiB)
+# warm (mmap)              0.3 ms   MPG 23.05 in 4.3 ms
+# warm, all records      365.5 ms
+# stale cache found?  True
+
+# the cold start is ~3x slower than parse_data, since it converts every cell and writes the
+# cache. every warm start after that opens in well under a millisecond: it only reads the
+# json header, the OS brings in the pages of the columns we actually touch. the numeric
+# columns are ready to use, summing MPG doesnt parse a single float.
+# the cache is bigger than the csv here (8 byte doubles for values like '18.0'), we trade
+# disk for not parsing.
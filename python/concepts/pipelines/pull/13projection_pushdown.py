@@ -0,0 +1,181 @@
+import csv
+import os
+import tempfile
+from operator import itemgetter
+from time import perf_counter
+
+# filter_data only looks at row[0], yet parse_data splits every line into all its columns
+# first, and most of those rows are thrown away right after.
+
+# two classic tricks from databases:
+#   projection: the caller says which columns it needs, we dont build the others.
+#   predicate pushdown: the filters move into the reader, they run on the raw line and we
+#                       only split as far as the column they need.
+# str.split(delimiter, n) stops after n splits, leaving the rest of the line untouched.
+
+def parse_data(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+def contains(word): # the filter_data test, as a predicate
+	return lambda value: word in value
+
+def parse_pushdown(fname, columns=None, where=None, filter_words=()):
+	# columns:      names of the columns to yield (None for all of them)
+	# where:        {column name: predicate(str) -> bool, or a word that must be in the value}
+	# filter_words: words that must be in the first column, like filter_data
+	with open(fname, newline='') as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		header = next(csv.reader(f, dialect=dialect))
+		index = {name: i for i, name in enumerate(header)}
+		wanted = [index[name] for name in columns] if columns else list(range(len(header)))
+		tests = [(index[name], contains(test) if isinstance(test, str) else test)
+				 for name, test in (where or {}).items()]
+		tests += [(0, contains(word)) for word in filter_words]
+		tests.sort(key=itemgetter(0)) # the leftmost columns are the cheapest to reach
+
+		delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+		# line.split(delimiter, n) gives the first n fields and the rest of the line in one
+		# piece: we split just far enough for the tests, and further only for the survivors.
+		split_tests = tests[-1][0] + 1 if tests else 0
+		split_rows = max(wanted) + 1
+		project = itemgetter(*wanted)
+		single = len(wanted) == 1
+
+		for line in f:
+			if quotechar in line:
+				# a quoted field may hide the delimiter or a line break, csv knows how to deal
+				# with it. while a quote is still open (an odd number of quote chars, an
+				# escaped "" counts twice) the record goes on on the next line.
+				lines, quotes = [line], line.count(quotechar)
+				while quotes % 2:
+					line = next(f, None)
+					if line is None:
+						break
+					lines.append(line)
+					quotes += line.count(quotechar)
+				row = next(csv.reader(lines, dialect))
+				if all(test(row[i]) for i, test in tests):
+					yield [row[i] for i in wanted]
+				continue
+			line = line.rstrip('\r\n')
+			if not line:
+				continue
+			if tests:
+				fields = line.split(delimiter, split_tests)
+				for i, test in tests:
+					if not test(fields[i]):
+						break
+				else:
+					if split_rows > split_tests:
+						fields = line.split(delimiter, split_rows)
+					row = project(fields)
+					yield [row] if single else list(row)
+			else:
+				row = project(line.split(delimiter, split_rows))
+				yield [row] if single else list(row)
+
+def pipeline(fname, *filter_words, columns=None, where=None):
+	# filter_words keep working as before, they are pushed down as tests on the first column
+	yield from parse_pushdown(fname, columns, where, filter_words)
+
+print('\nPUSHDOWN PIPELINE: (Chevrolet, Monte, Landau) columns (Car, MPG, Model)')
+for row in pipeline('cars.csv', 'Chevrolet', 'Monte', 'Landau', columns=('Car', 'MPG', 'Model')):
+	print(row)
+# ['Chevrolet Monte Carlo Landau', '15.5', '77']
+# ['Chevrolet Monte Carlo Landau', '19.2', '78']
+
+print('\nPREDICATES: Origin == Japan and Model == 82, columns (Car, MPG)')
+for row in pipeline('cars.csv', columns=('Car', 'MPG'),
+					where={'Origin': lambda value: value == 'Japan', 'Model': lambda value: value == '82'}):
+	print(row)
+# ['Mazda GLC Custom l', '37.0']
+# ['Mazda GLC Custom', '31.0']
+# ...
+
+# same rows as the old chain, when we ask for every column:
+print(list(pipeline('cars.csv', 'Chevrolet')) == list(filter_data(parse_data('cars.csv'), 'Chevrolet'))) # True
+
+#_______________________________________________________________________________________
+def make_big_file(fname, copies):
+	with open(fname) as f:
+		header = next(f)
+		rows = f.readlines()
+	fd, path = tempfile.mkstemp(suffix='.csv')
+	with os.fdopen(fd, 'w') as f:
+		f.write(header)
+		for _ in range(copies):
+			f.writelines(rows)
+	return path, len(rows) * copies
+
+def rows_per_sec(make_rows, n_rows, repeats=3):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		for _ in make_rows():
+			pass
+		best = min(best, perf_counter() - start)
+	return n_rows / best
+
+def read_header(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		return next(csv.reader(f, dialect=dialect))
+
+def old_way(fname, words, columns, where):
+	# full parse, then filters, then picking the columns
+	header = read_header(fname)
+	wanted = [header.index(name) for name in columns]
+	data = parse_data(fname)
+	for word in words:
+		data = filter_data(data, word)
+	for name, test in where.items():
+		i = header.index(name)
+		data = (row for row in data if test(row[i]))
+	return ([row[i] for i in wanted] for row in data)
+
+if __name__ == '__main__':
+	big, n_rows = make_big_file('cars.csv', 500)
+	cases = (
+		('Chevrolet, columns Car MPG', ('Chevrolet',), ('Car', 'MPG'), {}),
+		('Cylinders == 4, columns Car', (), ('Car',), {'Cylinders': lambda v: v == '4'}),
+		('Origin == Japan, all columns', (), None, {'Origin': lambda v: v == 'Japan'}),
+	)
+	try:
+		for label, words, columns, where in cases:
+			print(f'\nBENCHMARK: {n_rows:,} rows, {label}')
+			all_columns = columns or read_header(big)
+			speed = rows_per_sec(lambda: old_way(big, words, all_columns, where), n_rows)
+			print(f'parse everything {speed:>12,.0f} rows/sec')
+			speed = rows_per_sec(lambda: pipeline(big, *words, columns=columns, where=where), n_rows)
+			print(f'pushdown         {speed:>12,.0f} rows/sec')
+	finally:
+		os.remove(big)
+
+# BENCHMARK: 203,500 rows, Chevrolet, columns Car MPG
+# parse everything      786,047 rows/sec
+# pushdown            1,161,651 rows/sec
+
+# BENCHMARK: 203,500 rows, Cylinders == 4, columns Car
+# parse everything      872,022 rows/sec
+# pushdown            1,493,944 rows/sec
+
+# BENCHMARK: 203,500 rows, Origin == Japan, all columns
+# parse everything      970,106 rows/sec
+# pushdown            1,246,657 rows/sec
+
+# 1.3x to 1.7x faster. the rows that fail the tests only cost one partial split, and the
+# rows that pass only build the columns we asked for. even a test on the last column
+# (Origin) wins, since str.split is cheaper than the general csv parser.
+# lines with quotes still go through csv, so the results stay correct, just slower.
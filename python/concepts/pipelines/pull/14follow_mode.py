@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from time import perf_counter
+
+# our csv exports keep growing all day, but parse_data starts from byte 0 every time.
+
+# follow mode works like `tail -f`: it remembers in a checkpoint file how far it got, and
+# the next run (or the next poll) only reads what was appended after that. new rows go
+# through the same filter_data chain.
+# the checkpoint also keeps the inode and the size of the file, so we can tell when the
+# file was rotated (a new file with the same name) or truncated, and start over at byte 0.
+# note: rows appended to the old file after our last read and right before the rotation
+# are not seen, the same as with `tail -F`.
+
+def filter_data(data, word):
+	for row in data:
+		if word in row[0]:
+			yield row
+
+#_______________________________________________________________________________________
+def load_checkpoint(path):
+	try:
+		with open(path) as f:
+			return json.load(f)
+	except (FileNotFoundError, json.JSONDecodeError):
+		return None
+
+def save_checkpoint(path, checkpoint):
+	tmp = path + '.tmp' # writing aside and renaming, so a crash never leaves half a file
+	with open(tmp, 'w') as f:
+		json.dump(checkpoint, f)
+	os.replace(tmp, path)
+
+def start_offset(f, checkpoint):
+	# where to continue reading the open file f, or None while its header isnt complete yet
+	# (a rotated file can be empty, or half written, when we first see it)
+	stat = os.fstat(f.fileno())
+	if (checkpoint is None
+			or checkpoint['inode'] != stat.st_ino   # rotated: another file under the same name
+			or checkpoint['offset'] > stat.st_size): # truncated: the file got smaller
+		f.seek(0)
+		header = f.readline() # skiping header
+		if not header.endswith(b'\n'):
+			return None
+		return f.tell()
+	return checkpoint['offset']
+
+def records_end(data, quote):
+	# the end of the last complete record in data: just after its last line break that is
+	# not inside quotes (before it there is an even number of quote chars, an escaped ""
+	# counts twice). 0 if there is none yet.
+	if quote not in data:
+		return data.rfind(b'\n') + 1
+	end = start = quotes = 0
+	while True:
+		eol = data.find(b'\n', start)
+		if eol == -1:
+			return end
+		quotes += data.count(quote, start, eol)
+		if quotes % 2 == 0:
+			end = eol + 1
+		start = eol + 1
+
+def read_new_rows(fname, checkpoint, dialect, chunk_size=1 << 20):
+	# reads the complete records appended since the checkpoint, chunk_size bytes at a time.
+	# yields (rows, new checkpoint) per chunk, so a big backlog (first run, rotation) is
+	# never all in memory. a last record without its line break is still being written, so
+	# we leave it for the next read. a quoted field can hold a line break, so a chunk is
+	# only cut at the line breaks outside quotes.
+	quote = (dialect.quotechar or '"').encode()
+	with open(fname, 'rb') as f:
+		offset = start_offset(f, checkpoint)
+		if offset is None:
+			return
+		inode = os.fstat(f.fileno()).st_ino
+		f.seek(offset)
+		data = b''
+		while True:
+			chunk = f.read(chunk_size)
+			if not chunk:
+				return
+			data += chunk
+			end = records_end(data, quote) # only whole records
+			if not end: # a record longer than a chunk, reading on
+				continue
+			# split(b'\n'), not str.splitlines(): that one also splits on \x0c, \u2028...
+			# the lines keep their line break, so csv keeps the ones inside quoted fields.
+			lines = [line.decode() + '\n' for line in data[:end - 1].split(b'\n')]
+			rows = [row for row in csv.reader(lines, dialect) if row]
+			offset += end
+			data = data[end:]
+			yield rows, {'inode': inode, 'offset': offset}
+
+def sniff(fname):
+	with open(fname) as f:
+		return csv.Sniffer().sniff(f.read(2000))
+
+def follow(fname, checkpoint_path=None, poll=0.1, stop=None):
+	# yields the rows appended to fname, forever (or until stop.is_set()).
+	# the checkpoint is saved after each chunk of rows was consumed, so after a crash we
+	# start again from the last saved offset.
+	checkpoint_path = checkpoint_path or fname + '.checkpoint'
+	checkpoint = load_checkpoint(checkpoint_path)
+	dialect = sniff(fname)
+	while stop is None or not stop.is_set():
+		got_rows = False
+		try:
+			for rows, new_checkpoint in read_new_rows(fname, checkpoint, dialect):
+				yield from rows
+				got_rows = got_rows or bool(rows)
+				if new_checkpoint != checkpoint: # saved per chunk, once its rows were consumed
+					checkpoint = new_checkpoint
+					save_checkpoint(checkpoint_path, checkpoint)
+		except FileNotFoundError: # in the middle of a rotation, the new file isnt there yet
+			pass
+		if not got_rows:
+			time.sleep(poll)
+
+def pipeline(fname, *filter_words, checkpoint_path=None, poll=0.1, stop=None):
+	data = follow(fname, checkpoint_path, poll, stop)
+	for word in filter_words:
+		data = filter_data(data, word)
+	yield from data
+
+#_______________________________________________________________________________________
+# a small demo in a temporary folder: a writer thread keeps appending cars, rotates the
+# file once, and the follower prints the Chevrolets as they arrive.
+def writer(fname, rows, stop, delay=0.002, rotate_at=None, stamps=None):
+	for i, row in enumerate(rows):
+		if i == rotate_at: # a new file takes the place of the old one
+			os.replace(fname, fname + '.old')
+			with open(fname, 'w') as f:
+				f.write(header)
+		with open(fname, 'a') as f:
+			if stamps is not None:
+				stamps[i] = perf_counter()
+			f.write(';'.join([f'{row[0]} #{i}'] + row[1:]) + '\n')
+		time.sleep(delay)
+	time.sleep(0.5)
+	stop.set()
+
+with open('cars.csv') as f:
+	header = f.readline()
+	cars = [line.rstrip('\n').split(';') for line in f][1:] # without the type row
+
+if __name__ == '__main__':
+	folder = tempfile.mkdtemp()
+	fname = os.path.join(folder, 'live.csv')
+	with open(fname, 'w') as f:
+		f.write(header)
+
+	print('\nFOLLOWING: (Chevrolet, Monte)')
+	stop = threading.Event()
+	threading.Thread(target=writer, args=(fname, cars[:200], stop), kwargs={'rotate_at': 100}).start()
+	for row in pipeline(fname, 'Chevrolet', 'Monte', poll=0.01, stop=stop):
+		print(row[0])
+	# Chevrolet Monte Carlo #18
+	# Chevrolet Monte Carlo S #122     (after the rotation, read from the new file)
+	print(load_checkpoint(fname + '.checkpoint'))
+	# {'inode': 13533211, 'offset': 5878}
+
+	# restarting: nothing new was appended, so the follower reads nothing.
+	stop = threading.Event()
+	stop.set()
+	print(list(follow(fname, stop=stop)), '(nothing again, resumed from the checkpoint)')
+
+	# benchmark: latency from the moment a row is appended to the moment it comes out.
+	os.remove(fname + '.checkpoint')
+	for poll in (0.001, 0.01, 0.1):
+		with open(fname, 'w') as f:
+			f.write(header)
+		stamps, latencies = {}, []
+		stop = threading.Event()
+		thread = threading.Thread(target=writer, args=(fname, cars[:300], stop),
+								  kwargs={'delay': 0.003, 'stamps': stamps})
+		thread.start()
+		for row in follow(fname, fname + f'.{poll}.checkpoint', poll=poll, stop=stop):
+			i = int(row[0].rsplit('#', 1)[1])
+			latencies.append(perf_counter() - stamps[i])
+		thread.join()
+		latencies.sort()
+		print(f'poll={poll:<6} rows={len(latencies)}  median {latencies[len(latencies) // 2] * 1000:6.2f} ms'
+			  f'  p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms  max {latencies[-1] * 1000:6.2f} ms')
+	shutil.rmtree(folder)
+
+# poll=0.001  rows=300  median   0.67 ms  p99   7.12 ms  max  10.48 ms
+# poll=0.01   rows=300  median   4.71 ms  p99  14.33 ms  max  21.70 ms
+# poll=0.1    rows=300  median  53.58 ms  p99  99.27 ms  max  99.92 ms
+
+# the latency is basically half the poll interval on average, and up to one interval in
+# the worst case. a shorter interval means more stat/read calls on a file that didnt change,
+# so we pick it from the latency we can live with.
@@ -0,0 +1,143 @@
+import csv
+import itertools
+from array import array
+from time import perf_counter
+
+try:
+	import numpy as np
+except ImportError: # numpy is optional, the array module is always there
+	np = None
+
+# data_parser (02parsing_data.py) converts one row at a time:
+#   [converter(item) for converter, item in zip(converters, row)]
+# so for every cell python resolves the converter, calls it and appends to a new list.
+
+# if we look at the data as columns instead of rows, all the cells of a column share the
+# same converter. we can convert a whole column with a single map() call, that runs the
+# loop in C, and store numbers in typed arrays instead of lists of python objects.
+
+def read_file(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+headers    = ('make', 'model', 'year', 'vin', 'color')
+converters = (str, str, int, str, str)
+
+def data_parser(fname='car_data.csv'):
+	data = read_file(fname)
+	next(data)
+	for row in data:
+		parsed_row = [converter(item)
+					  for converter, item in zip(converters, row)]
+		yield parsed_row
+
+#_______________________________________________________________________________________
+# the schema: converter -> how a column of that type is stored.
+#   array typecodes: 'q' signed long long, 'd' double
+ARRAY_TYPES = {int: 'q', float: 'd'}
+NUMPY_TYPES = {int: 'int64', float: 'float64'}
+
+class RecordBatch:
+	# a block of rows stored as one column per header.
+	# numeric columns are typed arrays, the other ones are tuples.
+	__slots__ = ('headers', 'columns')
+
+	def __init__(self, headers, columns):
+		self.headers = headers
+		self.columns = columns
+
+	def __len__(self):
+		return len(self.columns[0]) if self.columns else 0
+
+	def __getitem__(self, header): # batch['year'] -> the whole column
+		return self.columns[self.headers.index(header)]
+
+	def rows(self): # back to rows, when someone really needs them
+		return zip(*self.columns)
+
+	def __repr__(self):
+		return f'RecordBatch(rows={len(self)}, headers={self.headers})'
+
+def convert_column(converter, cells, use_numpy):
+	if use_numpy and converter in NUMPY_TYPES:
+		# numpy parses the strings itself, no python int/float objects in the middle
+		return np.array(cells).astype(NUMPY_TYPES[converter])
+	if converter in ARRAY_TYPES:
+		return array(ARRAY_TYPES[converter], map(converter, cells))
+	if converter is str: # the cells are already strings
+		return cells
+	return tuple(map(converter, cells))
+
+def batch_parser(fname='car_data.csv', size=1000, use_numpy=np is not None):
+	data = read_file(fname)
+	next(data) # same rows as data_parser
+	while True:
+		block = list(itertools.islice(data, size))
+		if not block:
+			break
+		cells = zip(*block) # transposing the block, one tuple of cells per column
+		columns = [convert_column(converter, column, use_numpy)
+				   for converter, column in zip(converters, cells)]
+		yield RecordBatch(headers, columns)
+
+print('\n>>> next(batch_parser(size=4))')
+batch = next(batch_parser(size=4))
+print(batch)          # RecordBatch(rows=4, headers=('make', 'model', 'year', 'vin', 'color'))
+print(batch['year'])  # array('q', [2001, 1994, 2008, 1999])   (or a numpy array)
+for row in batch.rows():
+	print(row)
+# ('Pontiac', 'Sunfire', 2001, 'SCFAD06D99G713780', 'Maroon')
+# ('Pontiac', 'Grand Am', 1994, 'WBA6B8C59ED852919', 'Red')
+# ...
+
+# the same values as data_parser:
+rows = [list(row) for batch in batch_parser(size=64) for row in batch.rows()]
+print(rows == list(data_parser())) # True
+
+#_______________________________________________________________________________________
+# benchmark: cells/sec of the per-row comprehension vs the column-at-a-time conversion.
+# only the conversion is timed, the csv parsing is the same for both and done up front.
+def convert_rows(block):
+	return [[converter(item) for converter, item in zip(converters, row)] for row in block]
+
+def convert_columns(block, use_numpy):
+	return [convert_column(converter, column, use_numpy)
+			for converter, column in zip(converters, zip(*block))]
+
+def cells_per_sec(convert, blocks, n_cells, repeats=5):
+	best = float('inf')
+	for _ in range(repeats):
+		start = perf_counter()
+		for block in blocks:
+			convert(block)
+		best = min(best, perf_counter() - start)
+	return n_cells / best
+
+if __name__ == '__main__':
+	data = list(read_file('car_data.csv'))[1:] * 200
+	n_cells = len(data) * len(headers)
+	print(f'\nBENCHMARK: {len(data):,} rows, {n_cells:,} cells')
+	for size in (100, 1000, 10_000):
+		blocks = [data[i:i + size] for i in range(0, len(data), size)]
+		speed = cells_per_sec(convert_rows, blocks, n_cells)
+		print(f'block {size:<6} per-row comprehension {speed:>12,.0f} cells/sec')
+		speed = cells_per_sec(lambda block: convert_columns(block, False), blocks, n_cells)
+		print(f'block {size:<6} columns, array        {speed:>12,.0f} cells/sec')
+		if np is not None:
+			speed = cells_per_sec(lambda block: convert_columns(block, True), blocks, n_cells)
+			print(f'block {size:<6} columns, numpy        {speed:>12,.0f} cells/sec')
+
+# BENCHMARK: 199,800 rows, 999,000 cells
+# block 100    per-row comprehension    4,381,930 cells/sec
+# block 100    columns, array          18,939,451 cells/sec
+# block 1000   per-row comprehension    3,654,906 cells/sec
+# block 1000   columns, array          13,680,195 cells/sec
+# block 10000  per-row comprehension    5,221,475 cells/sec
+# block 10000  columns, array          16,681,226 cells/sec
+
+# ~4x faster. part of the win is that the str columns are not touched at all: the cells
+# are already strings, so the transposed tuple is the column. the year column is a single
+# map(int, ...) feeding an array of 8 byte integers instead of a list of int objects.
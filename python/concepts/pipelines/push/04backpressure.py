@@ -0,0 +1,250 @@
+import csv
+from itertools import islice
+from time import perf_counter
+
+# in 01pushing.py every item travels alone: one gen.send() per item per hop. there is no
+# buffering, so a stage cant work on many items at once, and we have no idea which stage
+# is the slow one.
+
+# here every stage gets a bounded buffer in front of it. items are collected in the buffer
+# and pushed downstream as one batch (a list) when the buffer is full, or when the pipeline
+# is closed. since pushing is synchronous, a full buffer means the producer has to wait
+# until the whole batch went down the chain: it can never run more than `capacity` items
+# ahead of its consumers. that is our backpressure.
+
+# decorator just to prime these generator functions
+def coroutine(fn):
+	def wrapper(*args, **kwargs):
+		gen = fn(*args, **kwargs)
+		next(gen)
+		return gen
+	return wrapper
+
+#_______________________________________________________________________________________
+class Stage:
+	_running = [] # stages currently pushing a batch, to split own time from downstream time
+
+	def __init__(self, name, gen, capacity=1000, targets=()):
+		if capacity < 1: # send_many would never get room in the buffer
+			raise ValueError(f'{name}: capacity must be at least 1, got {capacity}')
+		self.name = name
+		self.gen = gen          # primed coroutine, receives lists of items
+		self.capacity = capacity
+		self.targets = targets  # downstream stages, only used for the report
+		self.buffer = []
+		# counters
+		self.items_in = 0
+		self.batches = 0
+		self.elapsed = 0        # time spent pushing batches, downstream included
+		self.downstream = 0     # part of elapsed spent inside the downstream stages
+
+	def send(self, item):
+		self.items_in += 1
+		self.buffer.append(item)
+		if len(self.buffer) >= self.capacity: # buffer full: the producer waits right here
+			self.flush()
+
+	def send_many(self, items):
+		# fills the buffer up to its capacity, pushes it, and goes on with the rest.
+		# a huge input never sits in the buffer at once.
+		items = iter(items)
+		while True:
+			room = self.capacity - len(self.buffer)
+			self.buffer.extend(islice(items, room))
+			added = room - (self.capacity - len(self.buffer))
+			self.items_in += added
+			if len(self.buffer) >= self.capacity:
+				self.flush()
+			if added < room: # items exhausted
+				break
+
+	def flush(self):
+		if not self.buffer:
+			return
+		batch, self.buffer = self.buffer, []
+		self.batches += 1
+		Stage._running.append(self)
+		start = perf_counter()
+		try:
+			self.gen.send(batch)
+		finally:
+			elapsed = perf_counter() - start
+			Stage._running.pop()
+			self.elapsed += elapsed
+			if Stage._running:
+				Stage._running[-1].downstream += elapsed
+
+	def close(self):
+		# flushing what is left, then closing the coroutine, which closes its targets
+		self.flush()
+		self.gen.close()
+
+	@property
+	def items_out(self):
+		return sum(target.items_in for target in self.targets)
+
+	@property
+	def own_time(self):
+		return self.elapsed - self.downstream
+
+def stage(name, coroutine_fn, *targets, capacity=1000, **kwargs):
+	# builds a Stage around coroutine_fn(*targets, **kwargs)
+	return Stage(name, coroutine_fn(*targets, **kwargs), capacity, targets)
+
+def report(*stages):
+	print(f'{"stage":<10}{"in":>10}{"out":>10}{"batches":>9}{"own ms":>10}{"total ms":>10}')
+	for s in stages:
+		out = s.items_out if s.targets else '-'
+		print(f'{s.name:<10}{s.items_in:>10}{out:>10}{s.batches:>9}'
+			  f'{s.own_time * 1000:>10.2f}{s.elapsed * 1000:>10.2f}')
+
+#_______________________________________________________________________________________
+# the coroutines now receive batches and push batches. when the pipeline is closed they
+# get a GeneratorExit, and the `finally` closes (and so flushes) the next stages.
+@coroutine
+def mapping(target, fn):
+	try:
+		while True:
+			batch = yield
+			target.send_many(map(fn, batch))
+	finally:
+		target.close()
+
+@coroutine
+def filtering(target, predicate):
+	try:
+		while True:
+			batch = yield
+			target.send_many(filter(predicate, batch))
+	finally:
+		target.close()
+
+@coroutine
+def broadcast(*targets): # fan-out: every target receives every item
+	try:
+		while True:
+			batch = yield
+			for target in targets:
+				target.send_many(batch)
+	finally:
+		for target in targets:
+			target.close()
+
+@coroutine
+def printing():
+	while True:
+		batch = yield
+		for received in batch:
+			print(received)
+
+@coroutine
+def collecting(results):
+	while True:
+		batch = yield
+		results.extend(batch)
+
+#_______________________________________________________________________________________
+def read_file(fname):
+	with open(fname) as f:
+		dialect = csv.Sniffer().sniff(f.read(2000))
+		f.seek(0)
+		next(f)
+		yield from csv.reader(f, dialect=dialect)
+
+#            /-> pontiac -> red -> printer
+# fan_out --                                 (broadcast)
+#            \-> years   -> collector
+all_years = []
+printer = stage('printer', printing, capacity=2)
+red = stage('red', filtering, printer, predicate=lambda row: row[4] == 'Red', capacity=4)
+pontiac = stage('pontiac', filtering, red, predicate=lambda row: row[0] == 'Pontiac')
+collector = stage('collector', collecting, results=all_years)
+years = stage('years', mapping, collector, fn=lambda row: int(row[2]))
+fan_out = stage('fan_out', broadcast, pontiac, years, capacity=100)
+
+fan_out.send_many(read_file('car_data.csv'))
+fan_out.close() # flush on close: everything still buffered goes down the chain
+# ['Pontiac', 'Grand Am', '1994', 'WBA6B8C59ED852919', 'Red']
+# ['Pontiac', 'Vibe', '2005', '1G6KD57Y33U225154', 'Red']
+# ...
+
+print(len(all_years)) # 1000
+report(fan_out, pontiac, red, printer, years, collector)
+# stage           in       out  batches    own ms  total ms
+# fan_out       1000      2000       10      0.08      0.62
+# pontiac       1000        37        1      0.11      0.21
+# red             37         4       10      0.03      0.11
+# printer          4         -        2      0.08      0.08
+# years         1000      1000        1      0.33      0.33
+# collector     1000         -        1      0.01      0.01
+
+#_______________________________________________________________________________________
+# benchmark: the same chain with one send() per item per hop, as in 01pushing.py,
+# against the buffered stages with different capacities.
+@coroutine
+def mapping_one(target, fn):
+	while True:
+		target.send(fn((yield)))
+
+@coroutine
+def filtering_one(target, predicate):
+	while True:
+		item = yield
+		if predicate(item):
+			target.send(item)
+
+@coroutine
+def counting_one(counter):
+	while True:
+		yield
+		counter[0] += 1
+
+@coroutine
+def counting(counter):
+	while True:
+		counter[0] += len((yield))
+
+if __name__ == '__main__':
+	items = list(range(1_000_000))
+	double = lambda x: x * 2
+	even_tens = lambda x: x % 10 == 0
+	print(f'\nBENCHMARK: {len(items):,} items through map -> filter -> map -> count')
+
+	counter = [0]
+	head = mapping_one(filtering_one(mapping_one(counting_one(counter), double), even_tens), double)
+	start = perf_counter()
+	for item in items:
+		head.send(item)
+	elapsed = perf_counter() - start
+	print(f'one send() per item  {len(items) / elapsed:>14,.0f} items/sec')
+
+	for capacity in (1, 10, 100, 1000, 10_000):
+		counter = [0]
+		sink = stage('count', counting, counter=counter, capacity=capacity)
+		second = stage('map2', mapping, sink, fn=double, capacity=capacity)
+		middle = stage('filter', filtering, second, predicate=even_tens, capacity=capacity)
+		first = stage('map1', mapping, middle, fn=double, capacity=capacity)
+		start = perf_counter()
+		first.send_many(items)
+		first.close()
+		elapsed = perf_counter() - start
+		print(f'capacity={capacity:<10} {len(items) / elapsed:>14,.0f} items/sec')
+	report(first, middle, second, sink)
+
+# BENCHMARK: 1,000,000 items through map -> filter -> map -> count
+# one send() per item       2,325,592 items/sec
+# capacity=1                 158,501 items/sec
+# capacity=10              1,104,171 items/sec
+# capacity=100             3,200,117 items/sec
+# capacity=1000            4,255,437 items/sec
+# capacity=10000           4,185,926 items/sec
+# stage             in       out  batches    own ms  total ms
+# map1         1000000   1000000      100     97.42    227.00
+# filter       1000000    200000      100    108.31    129.58
+# map2          200000    200000       20     21.24     21.28
+# count         200000         -       20      0.04      0.04
+
+# with tiny buffers the bookkeeping costs more than it saves, but from ~100 items per batch
+# the stages run their loops inside map()/filter() and we get ~2x the throughput of one
+# send() per item. the report shows where the time goes: `own ms` excludes the time spent
+# downstream, so the slow consumer is the stage with the biggest own time (filter here).
@@ -0,0 +1,115 @@
+from multiprocessing import Pool, cpu_count
+from time import perf_counter
+
+# concepts/multiprocessing.py creates every Process by hand, splits the work by hand, and
+# the processes cant give anything back. here is a small reusable engine for the same kind
+# of CPU-bound work:
+#   - map(fn, items) returns the results, in the same order as the items.
+#   - the items are sent in chunks. every worker pulls the next chunk from a shared queue
+#     as soon as it is done with the previous one, so a fast worker takes the work a slow
+#     one didnt get to (the same effect as work stealing).
+#   - the chunk size is picked automatically: ~4 chunks per worker, enough to balance the
+#     load without paying the pickling cost for every single item.
+#   - the pool is created on the first call and kept warm, so the next calls dont pay for
+#     starting processes again.
+
+def counter(n):
+	count = 0
+	while count < n:
+		count += 1
+	return count
+
+#_______________________________________________________________________________________
+class ParallelMap:
+	def __init__(self, workers=None, chunks_per_worker=4):
+		self.workers = workers or cpu_count()
+		self.chunks_per_worker = chunks_per_worker
+		self._pool = None
+
+	@property
+	def pool(self): # started once, reused by every call
+		if self._pool is None:
+			self._pool = Pool(self.workers)
+		return self._pool
+
+	def chunksize(self, n_items):
+		n_chunks = self.workers * self.chunks_per_worker
+		return max(1, -(-n_items // n_chunks)) # ceil division
+
+	def map(self, fn, items, chunksize=None):
+		items = list(items)
+		if self.workers == 1: # no processes at all, nothing to pickle
+			return list(map(fn, items))
+		return self.pool.map(fn, items, chunksize or self.chunksize(len(items)))
+
+	def imap(self, fn, items, chunksize=None):
+		# lazy version: results come back in order, as soon as they are ready
+		items = list(items)
+		if self.workers == 1:
+			return map(fn, items)
+		return self.pool.imap(fn, items, chunksize or self.chunksize(len(items)))
+
+	def close(self):
+		if self._pool is not None:
+			self._pool.close()
+			self._pool.join()
+			self._pool = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+#_______________________________________________________________________________________
+# the pool may start new interpreters that import this module again, so everything that
+# runs something must stay behind the __main__ check (like concepts/multiprocessing.py).
+if __name__ == '__main__':
+	with ParallelMap() as engine:
+		print(engine.map(counter, [10, 20, 30])) # [10, 20, 30]
+
+		# benchmark: about the same 100_000_000 counts as concepts/multiprocessing.py, but split
+		# in 64 uneven tasks, so a static split by hand would leave some cores idle.
+		# (8 rounds of 1..8 units: 288 units of 347_222 counts)
+		tasks = [(i % 8 + 1) * 347_222 for i in range(64)]
+		print(f'\nBENCHMARK: {len(tasks)} tasks, {sum(tasks):,} counts, {cpu_count()} cpu(s)')
+
+		start = perf_counter()
+		serial = [counter(n) for n in tasks]
+		base = perf_counter() - start
+		print(f'serial         {base:6.2f} sec')
+
+		for workers in range(1, cpu_count() + 1):
+			with ParallelMap(workers) as engine:
+				start = perf_counter()
+				engine.map(counter, [1] * workers) # cold: starting the processes
+				cold = perf_counter() - start
+				start = perf_counter()
+				results = engine.map(counter, tasks) # warm pool
+				elapsed = perf_counter() - start
+			assert results == serial
+			speedup = base / elapsed
+			print(f'workers={workers:<4}  {elapsed:6.2f} sec  speedup {speedup:4.2f}x  '
+				  f'efficiency {speedup / workers:4.0%}  (pool start {cold * 1000:.0f} ms)')
+
+		# chunk size: too small pays pickling per item, too big leaves workers idle at the end.
+		with ParallelMap() as engine:
+			engine.map(counter, [1])
+			many = [1000] * 100_000
+			for chunksize in (1, 100, engine.chunksize(len(many)), len(many)):
+				start = perf_counter()
+				engine.map(counter, many, chunksize)
+				print(f'100k tiny tasks, chunksize={chunksize:<7} {perf_counter() - start:6.2f} sec')
+
+# BENCHMARK: 64 tasks, 99,999,936 counts, 1 cpu(s)
+# serial           3.85 sec
+# workers=1        3.78 sec  speedup 1.02x  efficiency 102%  (pool start 0 ms)
+# 100k tiny tasks, chunksize=1         3.67 sec
+# 100k tiny tasks, chunksize=100       3.42 sec
+# 100k tiny tasks, chunksize=25000     3.72 sec
+# 100k tiny tasks, chunksize=100000    3.42 sec
+
+# this machine has a single cpu, so there is nothing to scale to. with more cores every
+# row adds one more worker: the speedup should stay close to the number of workers (and
+# the efficiency close to 100%) as long as the chunks are big enough to hide the pickling.
+# with one worker the engine skips the pool and runs in this process, nothing is lost.
@@ -0,0 +1,158 @@
+import os
+from array import array
+from multiprocessing import Pool, Process, Queue, cpu_count
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+
+# the processes in concepts/multiprocessing.py cant give anything back. the usual way is a
+# Queue or the return value of Pool.map, but both pickle the result in the worker, send the
+# bytes through a pipe, and unpickle a copy in the parent. for big numeric results most of
+# the time goes there.
+
+# SharedArray is a typed array living in a shared memory block: the parent creates it, the
+# workers attach to it by name and each one writes its own slice in place. when they are
+# done the parent already has the whole result, nothing was pickled nor copied.
+
+class SharedArray:
+	def __init__(self, typecode, length, name=None):
+		self.typecode = typecode
+		self.length = length
+		itemsize = array(typecode).itemsize
+		if name is None: # the owner: creates the block, and must unlink it at the end
+			self.shm = SharedMemory(create=True, size=max(1, length * itemsize))
+			self.owner = os.getpid()
+		else:            # a worker: attaches to the block created by the owner
+			self.shm = SharedMemory(name=name)
+			self.owner = None
+		self.view = self.shm.buf[:length * itemsize].cast(typecode)
+
+	def __reduce__(self): # sending it to a worker only sends its name, never the data
+		return SharedArray, (self.typecode, self.length, self.shm.name)
+
+	def __len__(self):
+		return self.length
+
+	def __getitem__(self, i):
+		return self.view[i]
+
+	def __setitem__(self, i, value):
+		self.view[i] = value
+
+	def slices(self, parts):
+		# (start, stop) of `parts` slices of about the same size
+		step = -(-self.length // parts)
+		return [(start, min(start + step, self.length)) for start in range(0, self.length, step)]
+
+	def close(self):
+		self.view.release() # the block cant be closed while a view still points into it
+		self.shm.close()
+		if self.owner == os.getpid(): # a forked worker gets a copy of the owner's object
+			self.shm.unlink()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+#_______________________________________________________________________________________
+# the work: n doubles, item i = float(i) (cheap on purpose, so we see the cost of moving it)
+def compute(start, stop):
+	return array('d', range(start, stop))
+
+def into_shared(out, start, stop): # writes its slice in place, returns nothing
+	out[start:stop] = compute(start, stop)
+	out.close()
+
+def into_queue(queue, start, stop):
+	queue.put((start, compute(start, stop)))
+
+def returned(bounds):
+	return compute(*bounds)
+
+def with_shared(n, workers):
+	out = SharedArray('d', n)
+	processes = []
+	try:
+		for start, stop in out.slices(workers):
+			p = Process(target=into_shared, args=(out, start, stop))
+			p.start()
+			processes.append(p)
+		for p in processes:
+			p.join()
+		# a worker that raised left its slice zero filled: that is not a result
+		failed = [p.exitcode for p in processes if p.exitcode != 0]
+		if failed:
+			raise RuntimeError(f'{len(failed)} of {len(processes)} workers failed (exit codes {failed})')
+	except BaseException:
+		for p in processes:
+			if p.is_alive():
+				p.terminate()
+			p.join()
+		out.close() # the block is unlinked, the caller never gets it
+		raise
+	return out
+
+def with_queue(n, workers):
+	queue = Queue()
+	bounds = [(start, min(start + -(-n // workers), n)) for start in range(0, n, -(-n // workers))]
+	processes = [Process(target=into_queue, args=(queue, start, stop)) for start, stop in bounds]
+	for p in processes:
+		p.start()
+	chunks = dict(queue.get() for _ in processes) # before join, or a full pipe blocks the worker
+	for p in processes:
+		p.join()
+	result = array('d')
+	for start in sorted(chunks):
+		result.extend(chunks[start])
+	return result
+
+def with_pool(pool, n, workers):
+	bounds = [(start, min(start + -(-n // workers), n)) for start in range(0, n, -(-n // workers))]
+	result = array('d')
+	for chunk in pool.map(returned, bounds):
+		result.extend(chunk)
+	return result
+
+#_______________________________________________________________________________________
+if __name__ == '__main__':
+	with with_shared(10, 2) as out:
+		print(out.view.tolist()) # [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+
+	n, workers = 10_000_000, max(2, cpu_count())
+	print(f'\nBENCHMARK: {n:,} doubles ({n * 8 / 2**20:.0f} MiB) from {workers} workers, {cpu_count()} cpu(s)')
+
+	start = perf_counter()
+	compute(0, n)
+	work = perf_counter() - start
+	print(f'just computing, no processes {work:6.2f} sec')
+
+	start = perf_counter()
+	with with_shared(n, workers) as out:
+		elapsed = perf_counter() - start
+		check = out[n - 1]
+	print(f'shared memory                {elapsed:6.2f} sec')
+
+	start = perf_counter()
+	result = with_queue(n, workers)
+	print(f'Process + Queue              {perf_counter() - start:6.2f} sec')
+	assert result[n - 1] == check
+
+	with Pool(workers) as pool:
+		pool.map(returned, [(0, 1)] * workers) # starting the pool is not part of the test
+		start = perf_counter()
+		result = with_pool(pool, n, workers)
+		print(f'Pool.map (warm pool)         {perf_counter() - start:6.2f} sec')
+	assert result[n - 1] == check
+
+# BENCHMARK: 10,000,000 doubles (76 MiB) from 2 workers, 1 cpu(s)
+# just computing, no processes   1.13 sec
+# shared memory                  1.23 sec
+# Process + Queue                1.77 sec
+# Pool.map (warm pool)           1.69 sec
+
+# (on a single cpu the workers take turns, so the compute itself is not faster here.)
+# with shared memory the processes cost ~0.1 sec on top of the work: starting them, and
+# nothing else. the Queue and Pool.map add ~0.6 sec to move 76 MiB: pickling in the worker,
+# the pipe, unpickling and joining the chunks in the parent. that part grows with the size
+# of the result, while the shared memory version stays flat.
@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, CancelledError, wait
+from time import perf_counter
+
+# 01threads.py starts a new Thread for every task and joins them by hand: the threads are
+# not reused, the functions cant return anything, and an exception just gets printed by
+# the thread and lost.
+
+# ThreadPool keeps a fixed number of worker threads waiting on a task queue.
+#   - submit(fn, *args) gives back a Future: .result() waits and returns the value, or
+#     raises the exception that fn raised, in the thread that asks for it.
+#   - a task still waiting in the queue can be cancelled (future.cancel()).
+#   - maxsize bounds the queue: when it is full, submit() blocks until a worker frees a
+#     place, so a fast producer cant pile up unlimited work.
+#   - queue_depth tells how many tasks are waiting, and max_depth the most seen so far.
+# (the stdlib concurrent.futures.ThreadPoolExecutor does the same, minus the bound and
+# the metric. we reuse its Future class, which already does the waiting and the callbacks.)
+
+class ThreadPool:
+	def __init__(self, workers=4, maxsize=0, name='pool'):
+		self.tasks = queue.Queue(maxsize)
+		self.max_depth = 0
+		self.closed = False
+		# closed and the enqueue change together: without it a task put between shutdown()
+		# setting closed and its stop marks would land after them and never run.
+		# (ThreadPoolExecutor has the same _shutdown_lock)
+		self.shutdown_lock = threading.Lock()
+		self.threads = [threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True)
+						for i in range(workers)]
+		for thread in self.threads:
+			thread.start()
+
+	@property
+	def queue_depth(self):
+		return self.tasks.qsize()
+
+	def submit(self, fn, *args, **kwargs):
+		future = Future()
+		with self.shutdown_lock:
+			if self.closed:
+				raise RuntimeError('cannot submit to a pool that was shut down')
+			self.tasks.put((future, fn, args, kwargs)) # blocks while the queue is full
+			self.max_depth = max(self.max_depth, self.tasks.qsize())
+		return future
+
+	def map(self, fn, *iterables):
+		# like map(), the results in order. all the tasks are submitted first.
+		futures = [self.submit(fn, *args) for args in zip(*iterables)]
+		return (future.result() for future in futures)
+
+	def _work(self):
+		while True:
+			task = self.tasks.get()
+			if task is None: # shutdown
+				return
+			future, fn, args, kwargs = task
+			if not future.set_running_or_notify_cancel(): # it was cancelled while waiting
+				continue
+			try:
+				result = fn(*args, **kwargs)
+			except BaseException as exc:
+				future.set_exception(exc)
+			else:
+				future.set_result(result)
+
+	def shutdown(self, wait=True, cancel_pending=False):
+		with self.shutdown_lock:
+			if not self.closed: # a second shutdown only waits
+				self.closed = True
+				if cancel_pending:
+					while True:
+						try:
+							task = self.tasks.get_nowait()
+						except queue.Empty:
+							break
+						task[0].cancel()
+				for _ in self.threads:
+					self.tasks.put(None) # one stop mark per worker, after the tasks already queued
+		if wait:
+			for thread in self.threads:
+				thread.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.shutdown()
+
+#_______________________________________________________________________________________
+# the tasks of 01threads.py, 10 times shorter, returning instead of printing
+def drink():
+	time.sleep(0.2)
+	return 'you drank coffee'
+
+def eat():
+	time.sleep(0.5)
+	return 'you eat breakfast'
+
+def study(subject):
+	time.sleep(0.8)
+	return f'you finished studying {subject}'
+
+def spill():
+	time.sleep(0.1)
+	raise ValueError('you spilled the coffee')
+
+if __name__ == '__main__':
+	start = perf_counter()
+	with ThreadPool(workers=3) as pool:
+		futures = [pool.submit(drink), pool.submit(eat), pool.submit(study, 'maths')]
+		for future in futures:
+			print(future.result())
+	print(f'{perf_counter() - start:.1f} sec') # 0.8 sec, the longest task, not the sum
+	# you drank coffee
+	# you eat breakfast
+	# you finished studying maths
+
+	with ThreadPool(workers=1) as pool:
+		spilled = pool.submit(spill)
+		waiting = pool.submit(study, 'history') # the only worker is busy with spill()
+		print(pool.queue_depth, waiting.cancel()) # 2 True  (or 1 if spill() already started)
+		try:
+			spilled.result()
+		except ValueError as exc: # raised again here, in the main thread
+			print('caught:', exc) # caught: you spilled the coffee
+		try:
+			waiting.result()
+		except CancelledError:
+			print('history was cancelled')
+
+	# benchmark: bursts of tiny I/O tasks (1 ms sleep each), all submitted at once. the
+	# latency is the time from submit() until the task is done.
+	def task():
+		time.sleep(0.001)
+		return perf_counter()
+
+	workers = 16
+	print(f'\nBENCHMARK: tasks of 1 ms, {workers} workers')
+	with ThreadPool(workers) as pool:
+		for burst in (16, 100, 1000, 5000):
+			pool.max_depth = 0
+			start = perf_counter()
+			submitted = []
+			for _ in range(burst):
+				submitted.append((perf_counter(), pool.submit(task)))
+			wait([future for _, future in submitted])
+			total = perf_counter() - start
+			latencies = sorted(future.result() - at for at, future in submitted)
+			print(f'burst {burst:>5}  p50 {latencies[burst // 2] * 1000:7.1f} ms'
+				  f'  p99 {latencies[int(burst * 0.99)] * 1000:7.1f} ms'
+				  f'  max depth {pool.max_depth:>5}  {burst / total:>7,.0f} tasks/sec')
+
+# BENCHMARK: tasks of 1 ms, 16 workers
+# burst    16  p50     1.4 ms  p99     1.6 ms  max depth    16    9,462 tasks/sec
+# burst   100  p50     4.9 ms  p99     8.1 ms  max depth   100   11,249 tasks/sec
+# burst  1000  p50    38.6 ms  p99    69.1 ms  max depth   984   12,817 tasks/sec
+# burst  5000  p50   210.0 ms  p99   358.8 ms  max depth  4893   11,857 tasks/sec
+
+# the throughput stays flat around 12k tasks/sec (16 workers / 1 ms, minus the queue and
+# thread switching), so once a burst is bigger than the pool the extra tasks just wait in
+# the queue: the latency grows linearly with the load (~burst / throughput). queue_depth
+# shows it before the latency does. either add workers (for I/O-bound tasks), or bound the
+# queue with maxsize so the producer slows down instead.
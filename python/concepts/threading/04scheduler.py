@@ -0,0 +1,200 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+import traceback
+
+# 02daemon_threads.py runs one thread per timer, sleeping in a `while True` loop. with
+# hundreds of timers that is hundreds of threads, each one with its own stack, all of them
+# waking up on their own. and time.sleep(1) plus the time the work takes is more than 1 sec,
+# so every loop comes a bit later than the one before (drift).
+
+# Scheduler runs any number of timers from a single thread:
+#   - a heap keeps the timers sorted by the time they are due, the thread sleeps until the
+#     first one (or until a new timer comes before it).
+#   - call_later(delay, fn) runs fn once, call_every(interval, fn) runs it periodically.
+#   - the next run of a periodic timer is computed from the time it was due, not from the
+#     time it actually ran, so the delays dont add up. if it ran so late that whole periods
+#     were missed, those runs are skipped instead of firing all at once.
+#   - timer.cancel() and scheduler.shutdown() stop them cleanly.
+# the callbacks run in the scheduler thread, so they must be short (hand the long work to
+# a pool, 03thread_pool.py). an exception in one of them is printed and the others go on.
+
+class Timer:
+	__slots__ = ('fn', 'args', 'interval', 'due', 'cancelled')
+
+	def __init__(self, fn, args, interval, due):
+		self.fn = fn
+		self.args = args
+		self.interval = interval # None for the timers that run only once
+		self.due = due
+		self.cancelled = False
+
+	def cancel(self):
+		# it stays in the heap, the scheduler drops it when it comes up
+		self.cancelled = True
+
+class Scheduler:
+	def __init__(self, clock=time.monotonic):
+		self.clock = clock
+		self.heap = []
+		self.order = itertools.count() # breaks the ties between timers due at the same time
+		self.condition = threading.Condition()
+		self.running = True
+		self.thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+		self.thread.start()
+
+	def _schedule(self, timer):
+		with self.condition:
+			if not self.running:
+				raise RuntimeError('cannot schedule on a scheduler that was shut down')
+			heapq.heappush(self.heap, (timer.due, next(self.order), timer))
+			if self.heap[0][2] is timer: # the new timer comes first, the thread must wake up sooner
+				self.condition.notify()
+		return timer
+
+	def call_later(self, delay, fn, *args):
+		return self._schedule(Timer(fn, args, None, self.clock() + delay))
+
+	def call_every(self, interval, fn, *args, delay=None):
+		# first run after `delay` (one interval by default), then every `interval` seconds
+		if interval <= 0:
+			raise ValueError('interval must be positive')
+		first = interval if delay is None else delay
+		return self._schedule(Timer(fn, args, interval, self.clock() + first))
+
+	def _due_timers(self):
+		# waits until at least one timer is due, returns them all (or None on shutdown)
+		with self.condition:
+			while self.running:
+				if not self.heap:
+					self.condition.wait()
+					continue
+				now = self.clock()
+				if self.heap[0][0] > now:
+					self.condition.wait(self.heap[0][0] - now)
+					continue
+				due = []
+				while self.heap and self.heap[0][0] <= now:
+					_, _, timer = heapq.heappop(self.heap)
+					if not timer.cancelled:
+						due.append(timer)
+				return due
+			return None
+
+	def _run(self):
+		while True:
+			due = self._due_timers()
+			if due is None:
+				return
+			for timer in due:
+				if timer.cancelled: # cancelled by one of the callbacks before it
+					continue
+				try:
+					timer.fn(*timer.args)
+				except Exception:
+					traceback.print_exc()
+				if timer.interval is not None and not timer.cancelled:
+					# drift correction: the next run is one period after the time it was due
+					late = self.clock() - timer.due
+					missed = int(late // timer.interval) if late > 0 else 0
+					timer.due += timer.interval * (missed + 1)
+					with self.condition:
+						if self.running:
+							heapq.heappush(self.heap, (timer.due, next(self.order), timer))
+
+	def __len__(self): # timers waiting (the cancelled ones too, until they come up)
+		return len(self.heap)
+
+	def shutdown(self, wait=True):
+		with self.condition:
+			self.running = False
+			self.heap.clear()
+			self.condition.notify()
+		if wait and threading.current_thread() is not self.thread:
+			self.thread.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.shutdown()
+
+#_______________________________________________________________________________________
+if __name__ == '__main__':
+	# the timer of 02daemon_threads.py, without a thread of its own (and 10x faster)
+	count = itertools.count(1)
+	with Scheduler() as scheduler:
+		ticking = scheduler.call_every(0.1, lambda: print(f'\rlogged in for: {next(count)}', end=''))
+		scheduler.call_later(0.55, ticking.cancel)
+		time.sleep(0.8)
+	print() # logged in for: 5
+
+	# benchmark: n timers, each one every second with a random phase, for a few seconds.
+	# lateness = when the callback ran - when it was due. cpu = cpu time / wall time.
+	def report(label, lateness, cpu, wall):
+		lateness.sort()
+		n = len(lateness)
+		print(f'{label:<24} runs {n:>6,}  late p50 {lateness[n // 2] * 1000:6.2f} ms'
+			  f'  p99 {lateness[int(n * 0.99)] * 1000:7.2f} ms  max {lateness[-1] * 1000:7.2f} ms'
+			  f'  cpu {cpu / wall:5.1%}')
+
+	def with_scheduler(n, seconds, interval=1.0):
+		lateness = []
+		with Scheduler() as scheduler:
+			start = time.monotonic()
+			for _ in range(n):
+				due = [start + random.random() * interval] # when the next run is expected
+				def tick(due=due):
+					lateness.append(time.monotonic() - due[0])
+					due[0] += interval
+				scheduler.call_every(interval, tick, delay=due[0] - time.monotonic())
+			cpu = time.process_time()
+			time.sleep(seconds)
+			cpu = time.process_time() - cpu
+		return lateness, cpu
+
+	def with_threads(n, seconds, interval=1.0):
+		# one daemon thread per timer, like 02daemon_threads.py (sleeping until the next due
+		# time rather than a fixed second, so it doesnt drift either)
+		lateness = []
+		stop = threading.Event()
+		go, start = threading.Event(), [] # the clock starts once all the threads are running
+		def timer(phase):
+			go.wait()
+			due = start[0] + phase
+			while not stop.wait(max(0, due - time.monotonic())):
+				lateness.append(time.monotonic() - due)
+				due += interval
+		threads = [threading.Thread(target=timer, args=(random.random() * interval,), daemon=True)
+				   for _ in range(n)]
+		for thread in threads:
+			thread.start()
+		start.append(time.monotonic())
+		go.set()
+		cpu = time.process_time()
+		time.sleep(seconds)
+		cpu = time.process_time() - cpu
+		stop.set()
+		for thread in threads:
+			thread.join()
+		return lateness, cpu
+
+	seconds = 5
+	print(f'\nBENCHMARK: timers every 1 sec, for {seconds} sec')
+	for n in (1_000, 10_000):
+		report(f'{n:,} threads', *with_threads(n, seconds), seconds)
+		report(f'scheduler, {n:,} timers', *with_scheduler(n, seconds), seconds)
+
+# BENCHMARK: timers every 1 sec, for 5 sec
+# 1,000 threads            runs  5,036  late p50   0.11 ms  p99   14.33 ms  max   60.89 ms  cpu  4.5%
+# scheduler, 1,000 timers  runs  5,004  late p50   0.11 ms  p99    3.96 ms  max   12.31 ms  cpu  4.7%
+# 10,000 threads           runs 50,590  late p50 959.26 ms  p99 5834.02 ms  max 7862.75 ms  cpu 99.0%
+# scheduler, 10,000 timers runs 50,395  late p50   0.07 ms  p99    1.05 ms  max   40.56 ms  cpu 16.6%
+
+# with 1,000 timers both work, the scheduler just has a tighter tail (one thread, no fight
+# for the GIL). with 10,000 threads the process spends all its cpu switching between them:
+# the timers fire about a second late on average, and several seconds in the worst case.
+# the single scheduler thread stays around 1 ms late at p99, for 1/6 of one cpu, most of
+# it spent in the 10k callbacks per second themselves.